@@ -1,10 +1,36 @@
 import streamlit as st
-import requests
-import json
 import random
-from datetime import datetime
+import html
+from datetime import date, datetime, timedelta
 import os
+import threading
 import time
+import uuid
+
+from ingestion import SUPPORTED_EXTENSIONS, IngestionError, iter_paragraphs
+from models import Attempt, Paragraph, Question, QuestionPool, Quiz, new_id
+from near_duplicates import NearDuplicateIndex
+from quizgen import QuizEngine, RemoteEngine
+from quizgen.engine import DEFAULT_SETTINGS, settings_from_env
+from quizgen.http_client import PooledClient
+from quizgen.jobs import JobManager, QUEUED, RETRYING, DONE, FAILED
+from quizgen.metrics import RequestMetrics, serve_prometheus
+from quizgen.providers import create_provider
+from quizgen.quiz_cache import QuizCache
+from quizgen.rate_limiter import RateLimiter
+from quizgen.single_flight import SingleFlight
+from storage import create_storage
+from study_stats import StudyStats
+
+# -------------------------
+# Page Configuration (must be the first Streamlit command)
+# -------------------------
+st.set_page_config(
+    page_title="📘 Smart Study Partner",
+    page_icon="📘",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
 
 # -------------------------
 # CONFIGURATION - OpenAI API Key
@@ -15,7 +41,9 @@ def get_api_key():
     
     if not api_key:
         try:
-            api_key = st.secrets.get("OPENAI_API_KEY")
+            # Only read st.secrets when a secrets.toml exists; otherwise it renders an error
+            if st.secrets.load_if_toml_exists():
+                api_key = st.secrets.get("OPENAI_API_KEY")
         except (FileNotFoundError, KeyError):
             pass
     
@@ -23,7 +51,8 @@ def get_api_key():
 
 API_KEY = get_api_key()
 
-if not API_KEY:
+def show_api_key_help():
+    """Setup instructions, shown on the home page while no key is configured"""
     st.error("🚨 No API key found!")
     st.warning("""
     **Please add your OpenAI API key using ONE of these methods:**
@@ -45,215 +74,583 @@ if not API_KEY:
     ⚠️ **IMPORTANT:** Make sure you have:
     1. Added credits to your OpenAI account
     2. Set up billing at https://platform.openai.com/account/billing
+    
+    Or run without a key on the built-in offline generator: `export QUIZ_PROVIDER=fake`
     """)
-    st.stop()
 
 # OpenAI API endpoint
-OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_URL = "https://api.openai.com/v1"
+OPENAI_MODEL = "gpt-4o-mini"  # Using newer model instead of gpt-3.5-turbo
+# Local data (quiz cache, ...) - override with STUDY_DATA_DIR
+DATA_DIR = os.environ.get(
+    "STUDY_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+)
 
 # -------------------------
 # Rate Limiting Configuration
 # -------------------------
 RATE_LIMIT_CONFIG = {
-    "requests_per_minute": 3,
-    "min_delay_seconds": 20,
-    "max_retries": 3,
-    "retry_delay": 30
+    "requests_per_minute": float(os.environ.get("QUIZ_RPM", 3)),   # Env overrides are for load tests
+    "min_delay_seconds": float(os.environ.get("QUIZ_MIN_DELAY", 20)),
+    "burst": 1,                # Requests allowed back-to-back after an idle period
+    "shared_state_path": None  # e.g. os.path.join(DATA_DIR, "rate_limit.sqlite3") to share across processes
+}
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    """Token bucket shared by every session in this process"""
+    return RateLimiter(
+        RATE_LIMIT_CONFIG["requests_per_minute"],
+        min_delay_seconds=RATE_LIMIT_CONFIG["min_delay_seconds"],
+        burst=RATE_LIMIT_CONFIG["burst"],
+        state_path=RATE_LIMIT_CONFIG["shared_state_path"]
+    )
+
+# -------------------------
+# HTTP Client Configuration
+# -------------------------
+HTTP_CONFIG = {
+    "pool_size": 10,
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    "unhealthy_after": 3
+}
+
+@st.cache_resource(show_spinner=False)
+def get_http_client():
+    """Keep-alive connection pool shared by every session in this process"""
+    return PooledClient(
+        pool_size=HTTP_CONFIG["pool_size"],
+        connect_timeout=HTTP_CONFIG["connect_timeout"],
+        read_timeout=HTTP_CONFIG["read_timeout"],
+        unhealthy_after=HTTP_CONFIG["unhealthy_after"]
+    )
+
+# -------------------------
+# Model Provider Configuration
+# -------------------------
+PROVIDER_CONFIG = {
+    "backend": os.environ.get("QUIZ_PROVIDER", "openai"),  # "openai", "openai_compatible" or "fake"
+    "openai": {"api_key": API_KEY, "model": OPENAI_MODEL, "base_url": OPENAI_URL},
+    "openai_compatible": {
+        "base_url": os.environ.get("QUIZ_PROVIDER_URL", "http://localhost:8000/v1"),
+        "model": os.environ.get("QUIZ_PROVIDER_MODEL", "llama3.1:8b"),
+        "api_key": os.environ.get("QUIZ_PROVIDER_KEY"),
+        "json_mode": False  # Set True if the server supports response_format
+    },
+    "fake": {"latency": 0.0, "chunk_delay": 0.0, "seed": 0}
+}
+
+@st.cache_resource(show_spinner=False)
+def get_provider():
+    """Model backend selected by PROVIDER_CONFIG["backend"]"""
+    backend = PROVIDER_CONFIG["backend"]
+    return create_provider(backend, get_http_client(), **PROVIDER_CONFIG[backend])
+
+# -------------------------
+# Long Document Configuration
+# -------------------------
+CHUNK_CONFIG = {
+    "max_document_chars": 100000  # Chunk size and parallelism are engine settings (GENERATION_CONFIG)
+}
+
+# -------------------------
+# File Import Configuration
+# -------------------------
+IMPORT_CONFIG = {
+    "min_paragraph_chars": 80,    # Shorter pieces (headings, captions) are merged into the next paragraph
+    "max_paragraph_chars": 4000,  # Longer paragraphs are split at sentence ends
+    "max_paragraphs": 500         # Per import, across all files
+}
+
+# -------------------------
+# Question Pool Configuration
+# -------------------------
+POOL_CONFIG = {
+    "size": 20,                  # Questions generated per paragraph; quizzes are sampled from these
+    "top_up_size": 10,           # Questions added when the pool runs dry
+    "wrong_weight": 3.0,         # Extra sampling weight per earlier wrong answer
+    "top_up": True               # Refill in the background once fewer unasked questions than a quiz remain
+}
+
+# -------------------------
+# Background Job Configuration
+# -------------------------
+JOB_CONFIG = {
+    "max_workers": 4,              # Quizzes generated at the same time (all sessions)
+    "poll_interval": 1.0,          # Seconds between status checks while jobs run
+    "keep_finished_seconds": 600   # Uncollected results are dropped after this
+}
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    """Background worker pool shared by every session in this process"""
+    return JobManager(
+        max_workers=JOB_CONFIG["max_workers"],
+        keep_finished_seconds=JOB_CONFIG["keep_finished_seconds"]
+    )
+
+# -------------------------
+# Prefetch Configuration
+# -------------------------
+PREFETCH_CONFIG = {
+    "default": False,         # Opt-in per session from the sidebar
+    "spare_workers": 1,       # Workers kept free for quizzes the user asked for
+    "max_limiter_queue": 0    # Only prefetch while nobody is waiting for a rate-limit slot
+}
+
+# -------------------------
+# Quiz Cache Configuration
+# -------------------------
+CACHE_CONFIG = {
+    "path": os.path.join(DATA_DIR, "quiz_cache.sqlite3"),
+    "ttl_seconds": 7 * 24 * 60 * 60,
+    "max_entries": 5000
+}
+
+@st.cache_resource(show_spinner=False)
+def get_quiz_cache():
+    """One cache instance per server process, shared by all sessions"""
+    return QuizCache(
+        CACHE_CONFIG["path"],
+        ttl_seconds=CACHE_CONFIG["ttl_seconds"],
+        max_entries=CACHE_CONFIG["max_entries"]
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight():
+    """Identical quiz requests in flight at the same time share one API call"""
+    return SingleFlight()
+
+# -------------------------
+# Storage Configuration
+# -------------------------
+STORAGE_CONFIG = {
+    "backend": "sqlite",  # "sqlite" or "memory"
+    "options": {"path": os.path.join(DATA_DIR, "study_data.sqlite3")}
 }
 
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    """Persistent store for paragraphs, quizzes and history"""
+    return create_storage(STORAGE_CONFIG["backend"], **STORAGE_CONFIG["options"])
+
 # -------------------------
-# Backend: OpenAI Quiz Generator with Rate Limiting
+# Near-Duplicate Detection Configuration
 # -------------------------
-def generate_quiz(text, num_questions=5):
-    """Generate quiz questions using OpenAI API with rate limiting"""
-    if not text or not text.strip():
-        return None, "Please provide text to generate questions from."
+DUPLICATE_CONFIG = {
+    "enabled": True,     # Offer an existing quiz when new material is nearly the same
+    "threshold": 0.8,    # Estimated word-shingle similarity that counts as the same material
+    "num_perm": 64,      # MinHash functions per signature
+    "bands": 16,         # LSH bands of num_perm / bands rows each
+    "shingle_words": 3
+}
+
+@st.cache_resource(show_spinner=False)
+def get_paragraph_index():
+    """Near-duplicate index over every paragraph with an API question pool, all users.
+
+    Filled from storage in a background thread so the first page load doesn't
+    wait for it; until then lookups simply find fewer matches.
+    """
+    index = NearDuplicateIndex(
+        num_perm=DUPLICATE_CONFIG["num_perm"],
+        bands=DUPLICATE_CONFIG["bands"],
+        shingle_size=DUPLICATE_CONFIG["shingle_words"]
+    )
+    store = get_storage()
     
-    if not API_KEY:
-        return None, "API key is required."
+    def fill():
+        for user_id, paragraph_id, text in store.load_pooled_paragraphs():
+            index.add((user_id, paragraph_id), text)
     
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
-    }
+    threading.Thread(target=fill, name="paragraph-index", daemon=True).start()
+    return index
 
-    prompt = f"""Create exactly {num_questions} multiple-choice questions from the following text.
-
-IMPORTANT: Return ONLY valid JSON in this EXACT format with no additional text:
-
-{{
-  "quiz": [
-    {{
-      "question": "What is the main topic?",
-      "options": ["a) Option 1", "b) Option 2", "c) Option 3", "d) Option 4"],
-      "answer": "b) Option 2",
-      "explanation": "Brief explanation here"
-    }}
-  ]
-}}
-
-Rules:
-- Create clear questions based ONLY on the text below
-- Each question must have exactly 4 options (a, b, c, d)
-- Only ONE correct answer per question
-- Include brief explanations
-- Return ONLY the JSON, no markdown, no extra text
-
-Text to analyze:
-{text[:2000]}"""
-
-    data = {
-        "model": "gpt-4o-mini",  # Using newer model instead of gpt-3.5-turbo
-        "messages": [
-            {"role": "system", "content": "You are a helpful quiz generator that returns only valid JSON responses."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.5,
-        "max_tokens": 1500  # Reduced from 2048
-    }
+# -------------------------
+# List Pagination Configuration
+# -------------------------
+PAGINATION_CONFIG = {
+    "paragraphs_per_page": 10,   # Saved Paragraphs on the home page
+    "quizzes_per_page": 10,      # My Quiz Library
+    "attempts_per_page": 25,     # Quiz History
+    "rows_per_page": 50          # Per-paragraph table on the statistics page
+}
+
+# -------------------------
+# Request Metrics Configuration
+# -------------------------
+METRICS_CONFIG = {
+    "jsonl_path": None,        # e.g. os.path.join(DATA_DIR, "requests.jsonl") to log every API request
+    "prometheus_port": None,   # e.g. 9108 to serve http://127.0.0.1:9108/metrics
+    "keep_recent": 200,        # Requests listed on the admin page
+    "admin_page": os.environ.get("QUIZ_ADMIN_PAGE") == "1"  # Server-wide numbers for all users: off unless enabled
+}
+
+@st.cache_resource(show_spinner=False)
+def get_request_metrics():
+    """Latency, token and outcome numbers for every model API request"""
+    metrics = RequestMetrics(jsonl_path=METRICS_CONFIG["jsonl_path"], keep_recent=METRICS_CONFIG["keep_recent"])
+    if METRICS_CONFIG["prometheus_port"]:
+        serve_prometheus(metrics, METRICS_CONFIG["prometheus_port"])
+    return metrics
+
+# -------------------------
+# Quiz Generation Engine
+# -------------------------
+GENERATION_CONFIG = {
+    "service_url": os.environ.get("QUIZ_SERVICE_URL"),  # e.g. http://127.0.0.1:8600 to use quizgen.service
+    "poll_interval": 0.5,                               # Seconds between status checks on the service
+    # Overrides of quizgen.engine.DEFAULT_SETTINGS (retries, chunking, token budget,
+    # streaming, repeat filtering, offline fallback); the defaults live there only
+    "engine_settings": settings_from_env()
+}
+
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    """Generates quizzes in-process, or through the quiz service when one is configured"""
+    if GENERATION_CONFIG["service_url"]:
+        settings = dict(DEFAULT_SETTINGS, **GENERATION_CONFIG["engine_settings"])
+        return RemoteEngine(
+            GENERATION_CONFIG["service_url"],
+            poll_interval=GENERATION_CONFIG["poll_interval"],
+            local_fallback=settings["local_fallback"]
+        )
+    return QuizEngine(
+        get_provider(),
+        get_rate_limiter(),
+        cache=get_quiz_cache(),
+        metrics=get_request_metrics(),
+        single_flight=get_single_flight(),
+        **GENERATION_CONFIG["engine_settings"]
+    )
+
+# -------------------------
+# Shared Resources
+# -------------------------
+# Resolved on every run from the script thread: background workers can't look
+# up cached resources themselves once the run that started them has ended.
+rate_limiter = get_rate_limiter()
+http_client = get_http_client()
+job_manager = get_job_manager()
+storage = get_storage()
+in_flight = get_single_flight()
+request_metrics = get_request_metrics()
+engine = get_engine()
+paragraph_index = get_paragraph_index()
+
+# -------------------------
+# User Data (persistent)
+# -------------------------
+# Counters kept in storage alongside the user's paragraphs and quizzes
+PERSISTED_COUNTERS = ("api_calls", "total_questions_answered", "total_correct_answers")
+
+def get_user_id():
+    """Stable per-browser id kept in the URL so a refresh finds the same data"""
+    user_id = st.query_params.get("user")
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.query_params["user"] = user_id
+    return user_id
+
+def load_user_data():
+    """Load paragraphs, quizzes and counters once per session; history loads on demand"""
+    user_id = get_user_id()
+    counters = storage.load_counters(user_id)
+    
+    st.session_state.user_id = user_id
+    # Both keyed by paragraph id (dicts keep insertion order)
+    st.session_state.paragraphs = {p.id: p for p in storage.load_paragraphs(user_id)}
+    st.session_state.saved_quizzes = storage.load_quizzes(user_id)
+    st.session_state.question_pools = storage.load_pools(user_id)
+    for name in PERSISTED_COUNTERS:
+        st.session_state[name] = counters.get(name, 0)
 
-    # Retry logic
-    for attempt in range(RATE_LIMIT_CONFIG["max_retries"]):
+def add_paragraph(text):
+    paragraph = Paragraph.create(text)
+    storage.add_paragraph(st.session_state.user_id, paragraph)
+    st.session_state.paragraphs[paragraph.id] = paragraph
+    return paragraph.id
+
+def add_paragraphs(texts):
+    """Store many paragraphs in one write; returns their ids in order"""
+    now = time.time()
+    # Distinct timestamps keep the import order when paragraphs are loaded again
+    paragraphs = [Paragraph(id=new_id(), text=text, created_at=now + i * 1e-6) for i, text in enumerate(texts)]
+    storage.add_paragraphs(st.session_state.user_id, paragraphs)
+    for paragraph in paragraphs:
+        st.session_state.paragraphs[paragraph.id] = paragraph
+    return [paragraph.id for paragraph in paragraphs]
+
+def import_files(files):
+    """Split uploaded files into paragraphs and add them all at once.
+
+    Returns (paragraph ids, {file name: error}); a file that fails does not
+    stop the others.
+    """
+    limit = IMPORT_CONFIG["max_paragraphs"]
+    texts = []
+    errors = {}
+    for file in files:
+        if len(texts) >= limit:
+            errors[file.name] = f"⚠️ Skipped: one import takes at most {limit} paragraphs."
+            continue
+        found = len(texts)
         try:
-            response = requests.post(OPENAI_URL, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 429:
-                retry_after = response.headers.get('Retry-After', RATE_LIMIT_CONFIG["retry_delay"])
-                try:
-                    retry_after = int(retry_after)
-                except:
-                    retry_after = RATE_LIMIT_CONFIG["retry_delay"]
-                
-                if attempt < RATE_LIMIT_CONFIG["max_retries"] - 1:
-                    st.warning(f"⏳ Rate limit hit from OpenAI. Waiting {retry_after} seconds... (Attempt {attempt + 1}/{RATE_LIMIT_CONFIG['max_retries']})")
-                    time.sleep(retry_after)
-                    continue
-                else:
-                    return None, f"""⏳ **OpenAI Rate Limit Exceeded**
-                    
-Your OpenAI API is being throttled. This means:
-
-1. **No Credits/Billing**: You need to add payment method
-2. **Free Tier Exhausted**: Daily/monthly quota used up
-3. **Too Many Requests**: Hitting OpenAI's rate limits
-
-**Solutions:**
-✅ Add credits: https://platform.openai.com/account/billing/overview
-✅ Check usage: https://platform.openai.com/usage
-✅ Wait a few minutes and try again
-✅ Reduce questions to 3-5 per quiz
-
-**Make sure:**
-- Your API key is valid
-- Billing is set up
-- You have available credits
-"""
-            
-            if response.status_code == 401:
-                return None, """❌ **Invalid API Key**
-
-Your API key is not working. Please check:
-
-1. Copy your key again from: https://platform.openai.com/api-keys
-2. Make sure it starts with 'sk-proj-' or 'sk-'
-3. Update your `.streamlit/secrets.toml` file:
-   ```
-   OPENAI_API_KEY = "sk-proj-your-actual-key"
-   ```
-4. Restart the Streamlit app
-"""
-            
-            if response.status_code == 403:
-                return None, """❌ **Access Denied - No Billing Setup**
-                
-Your API key exists but has no access. This means:
+            for text in iter_paragraphs(file, file.name, min_chars=IMPORT_CONFIG["min_paragraph_chars"],
+                                        max_chars=IMPORT_CONFIG["max_paragraph_chars"]):
+                texts.append(text)
+                if len(texts) >= limit:
+                    errors[file.name] = f"⚠️ Cut off after {limit} paragraphs in this import."
+                    break
+        except IngestionError as e:
+            del texts[found:]
+            errors[file.name] = str(e)
+            continue
+        if len(texts) == found:
+            errors[file.name] = "⚠️ No text found (scanned PDFs have no text layer)."
+    return add_paragraphs(texts) if texts else [], errors
 
-**You MUST set up billing first:**
-1. Go to: https://platform.openai.com/account/billing/overview
-2. Click "Add payment method"
-3. Add a credit/debit card
-4. Add at least $5 in credits
-5. Wait 5-10 minutes for activation
+def delete_paragraph(paragraph_id):
+    cancel_generation(paragraph_id)
+    paragraph_index.remove((st.session_state.user_id, paragraph_id))
+    st.session_state.duplicate_offers.pop(paragraph_id, None)
+    storage.delete_paragraph(st.session_state.user_id, paragraph_id)
+    st.session_state.paragraphs.pop(paragraph_id, None)
+    st.session_state.saved_quizzes.pop(paragraph_id, None)
+    st.session_state.question_pools.pop(paragraph_id, None)
+    st.session_state.generation_errors.pop(paragraph_id, None)
 
-**Note:** Even with a valid API key, you CANNOT use the API without adding a payment method and credits.
+def clear_paragraphs():
+    cancel_all_generation()
+    for paragraph_id in st.session_state.paragraphs:
+        paragraph_index.remove((st.session_state.user_id, paragraph_id))
+    st.session_state.duplicate_offers = {}
+    storage.clear_paragraphs(st.session_state.user_id)
+    st.session_state.paragraphs = {}
+    st.session_state.saved_quizzes = {}
+    st.session_state.question_pools = {}
 
-Check your account status: https://platform.openai.com/account/billing/overview
-"""
-            
-            if response.status_code != 200:
-                error_data = response.json() if response.text else {}
-                error_message = error_data.get('error', {}).get('message', 'Unknown error')
-                
-                # Show detailed error
-                return None, f"""❌ **OpenAI API Error {response.status_code}**
+def set_quiz(paragraph_id, questions, source="api"):
+    quiz = Quiz.create(paragraph_id, questions, source=source)
+    st.session_state.saved_quizzes[paragraph_id] = quiz
+    storage.save_quiz(st.session_state.user_id, quiz)
 
-{error_message}
+def set_pool(paragraph_id, questions, source="api"):
+    """Replace the paragraph's question pool and take the first quiz from it.
 
-**Common Issues:**
-- 401: Invalid API key
-- 403: No billing/credits set up
-- 429: Rate limit or quota exceeded
-- 500: OpenAI server error (try again)
+    The first quiz keeps the generator's order, so questions answered while
+    it was still streaming stay where they were.
+    """
+    pool = QuestionPool.create(paragraph_id, questions, source=source)
+    st.session_state.question_pools[paragraph_id] = pool
+    storage.save_pool(st.session_state.user_id, pool)
+    set_quiz(paragraph_id, pool.questions[:st.session_state.num_questions], source=source)
+    # Only API questions are worth offering for similar material
+    key = (st.session_state.user_id, paragraph_id)
+    if source == "local":
+        paragraph_index.remove(key)
+    else:
+        paragraph_index.add(key, st.session_state.paragraphs[paragraph_id].text)
 
-**Check:**
-1. API Key: https://platform.openai.com/api-keys
-2. Billing: https://platform.openai.com/account/billing/overview
-3. Usage: https://platform.openai.com/usage
+def find_duplicate(paragraph_id):
+    """Offer the quiz of a nearly identical paragraph, if one has been generated; True if found"""
+    if not DUPLICATE_CONFIG["enabled"]:
+        return False
+    key = (st.session_state.user_id, paragraph_id)
+    matches = paragraph_index.query(
+        st.session_state.paragraphs[paragraph_id].text,
+        threshold=DUPLICATE_CONFIG["threshold"],
+        exclude={key},
+        limit=1
+    )
+    if not matches:
+        return False
+    similarity, (owner_id, source_id) = matches[0]
+    st.session_state.duplicate_offers[paragraph_id] = (similarity, owner_id, source_id)
+    return True
 
-**Full error:** {error_data}
-"""
+def reuse_quiz(paragraph_id):
+    """Copy the offered paragraph's questions instead of calling the API; False if they are gone"""
+    similarity, owner_id, source_id = st.session_state.duplicate_offers.pop(paragraph_id)
+    if owner_id == st.session_state.user_id:
+        pool = st.session_state.question_pools.get(source_id)
+    else:
+        pool = storage.load_pool(owner_id, source_id)
+    if pool is None:
+        paragraph_index.remove((owner_id, source_id))
+        return False
+    set_pool(paragraph_id, [q.to_dict() for q in pool.questions], source=pool.source)
+    return True
 
-            result = response.json()
-            generated_text = result['choices'][0]['message']['content'].strip()
-            
-            # Clean markdown
-            if generated_text.startswith('```json'):
-                generated_text = generated_text[7:]
-            if generated_text.startswith('```'):
-                generated_text = generated_text[3:]
-            if generated_text.endswith('```'):
-                generated_text = generated_text[:-3]
-            generated_text = generated_text.strip()
-
-            try:
-                quiz_data = json.loads(generated_text)
-            except json.JSONDecodeError:
-                import re
-                match = re.search(r'\{.*\}', generated_text, re.DOTALL)
-                if match:
-                    try:
-                        quiz_data = json.loads(match.group())
-                    except:
-                        return None, "Failed to parse quiz response."
-                else:
-                    return None, "Failed to parse quiz response."
+def save_pool(paragraph_id):
+    storage.save_pool(st.session_state.user_id, st.session_state.question_pools[paragraph_id])
 
-            quiz_questions = quiz_data.get("quiz", [])
-            
-            if not quiz_questions:
-                return None, "No questions generated. Try with more detailed text."
-            
-            for q in quiz_questions:
-                if "options" in q and "answer" in q and "question" in q:
-                    correct = q["answer"]
-                    random.shuffle(q["options"])
-                    q["answer"] = correct
-                else:
-                    return None, "Invalid question format received."
+def resample_quiz(paragraph_id):
+    """New quiz of the current size drawn from the pool, avoiding the current questions"""
+    pool = st.session_state.question_pools[paragraph_id]
+    current = st.session_state.saved_quizzes.get(paragraph_id)
+    questions = pool.sample(
+        st.session_state.num_questions,
+        favor_wrong=st.session_state.favor_wrong,
+        wrong_weight=POOL_CONFIG["wrong_weight"],
+        exclude={q.key for q in current.questions} if current is not None else ()
+    )
+    set_quiz(paragraph_id, questions, source=pool.source)
+    maybe_top_up(paragraph_id)
 
-            return quiz_questions, None
-            
-        except requests.exceptions.Timeout:
-            if attempt < RATE_LIMIT_CONFIG["max_retries"] - 1:
-                time.sleep(5)
-                continue
-            return None, "⏱️ Request timed out."
-        except requests.exceptions.RequestException as e:
-            return None, f"🌐 Network error: {str(e)}"
-        except Exception as e:
-            return None, f"❌ Unexpected error: {str(e)}"
+def quiz_matches_size(paragraph_id):
+    quiz = st.session_state.saved_quizzes.get(paragraph_id)
+    pool = st.session_state.question_pools.get(paragraph_id)
+    if quiz is None or pool is None:
+        return True
+    return len(quiz) == min(st.session_state.num_questions, len(pool))
+
+def paragraph_label(paragraph_id, length=60):
+    """Short preview used where a paragraph is referenced by id"""
+    paragraph = st.session_state.paragraphs.get(paragraph_id)
+    if paragraph is None:
+        return "(deleted paragraph)"
+    return paragraph.text[:length] + ("..." if len(paragraph.text) > length else "")
+
+def reset_page(list_key):
+    st.session_state[f"{list_key}_page"] = 1
+
+def list_filters(list_key, placeholder, options=None):
+    """Search box (and filter choice) above a list; changing either goes back to page 1"""
+    if options:
+        col1, col2 = st.columns([3, 1])
+    else:
+        col1, col2 = st.container(), None
+    with col1:
+        search = st.text_input("🔍 Search", key=f"{list_key}_search", placeholder=placeholder,
+                               label_visibility="collapsed", on_change=reset_page, args=(list_key,))
+    choice = None
+    if options:
+        with col2:
+            choice = st.selectbox("Show", options, key=f"{list_key}_filter", label_visibility="collapsed",
+                                  on_change=reset_page, args=(list_key,))
+    return search.strip().lower(), choice
+
+def paginate(items, list_key, per_page, total=None):
+    """The items on the current page of a list, with a page picker and item counts.
+
+    Only this slice gets rendered, so a run costs the same however long
+    the list grows. total is the unfiltered count, shown when it differs.
+    """
+    count = len(items)
+    pages = max(1, -(-count // per_page))
+    page_key = f"{list_key}_page"
+    # The list may have shrunk (deletes, a narrower search) since the page was picked
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
     
-    return None, "Failed after multiple retries."
+    page = 1
+    if pages > 1:
+        col1, col2 = st.columns([3, 1])
+        with col2:
+            page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key,
+                                   label_visibility="collapsed")
+    else:
+        col1 = st.container()
+    start = (page - 1) * per_page
+    end = min(start + per_page, count)
+    with col1:
+        filtered = f" (filtered from {total})" if total is not None and total != count else ""
+        if count:
+            st.caption(f"Showing {start + 1}-{end} of {count}{filtered} · page {page} of {pages}")
+        else:
+            st.caption("🔍 Nothing matches the search or filter.")
+    return items[start:end]
+
+def open_quiz(paragraph_id):
+    # A changed "Questions per quiz" setting is applied from the pool, no API call
+    if not quiz_matches_size(paragraph_id):
+        resample_quiz(paragraph_id)
+    st.session_state.current_paragraph_id = paragraph_id
+    start_attempt()
+    st.session_state.page = "quiz"
+
+def start_attempt():
+    """Fresh answers and a new attempt id; submitting records this id once"""
+    st.session_state.user_answers = {}
+    st.session_state.show_results = False
+    st.session_state.attempt_id = new_id()
+
+def submit_attempt(paragraph_id, quiz):
+    """Score and record the current attempt; repeated submits return the recorded one"""
+    if st.session_state.attempt_id is None:
+        st.session_state.attempt_id = new_id()
+    attempt = st.session_state.last_attempt
+    if attempt is not None and attempt.id == st.session_state.attempt_id:
+        return attempt
+    
+    answers = st.session_state.user_answers
+    score = sum(1 for i, q in enumerate(quiz.questions) if answers.get(i) == q.answer)
+    total = len(quiz)
+    attempt = Attempt(
+        id=st.session_state.attempt_id,
+        quiz_id=quiz.id,
+        paragraph_id=paragraph_id,
+        score=score,
+        total=total,
+        percentage=(score / total) * 100,
+        date=datetime.now().strftime("%Y-%m-%d %H:%M")
+    )
+    st.session_state.last_attempt = attempt
+    if not add_history_record(attempt):
+        return attempt
+    
+    bump_counter("total_questions_answered", total)
+    bump_counter("total_correct_answers", score)
+    
+    pool = st.session_state.question_pools.get(paragraph_id)
+    if pool is not None:
+        for i, q in enumerate(quiz.questions):
+            pool.record(q, answers.get(i) == q.answer)
+        save_pool(paragraph_id)
+        maybe_top_up(paragraph_id)
+    return attempt
+
+def bump_counter(name, amount=1):
+    # The stored total also picks up increments made in the user's other tabs
+    st.session_state[name] = storage.add_counter(st.session_state.user_id, name, amount)
+
+def reset_counters():
+    for name in PERSISTED_COUNTERS:
+        st.session_state[name] = 0
+        storage.set_counter(st.session_state.user_id, name, 0)
+
+def get_quiz_history():
+    if st.session_state.quiz_history is None:
+        st.session_state.quiz_history = storage.load_history(st.session_state.user_id)
+    return st.session_state.quiz_history
+
+def get_study_stats():
+    """Running aggregates over the history; built from it only if none were stored yet"""
+    if st.session_state.study_stats is None:
+        stats = storage.load_stats(st.session_state.user_id)
+        if stats is None:
+            stats = StudyStats.from_attempts(get_quiz_history())
+        st.session_state.study_stats = stats
+    return st.session_state.study_stats
+
+def add_history_record(attempt):
+    """Store an attempt and update the stats; False if this attempt id was already stored"""
+    # Storage applies the attempt to the stored stats, which include other tabs' attempts
+    stats = storage.add_attempt(st.session_state.user_id, attempt)
+    if stats is None:
+        return False
+    st.session_state.study_stats = stats
+    if st.session_state.quiz_history is not None:
+        st.session_state.quiz_history.append(attempt)
+    return True
+
+def clear_quiz_history():
+    storage.clear_history(st.session_state.user_id)
+    st.session_state.quiz_history = []
+    st.session_state.study_stats = StudyStats()
 
 # -------------------------
 # Initialize Session State
@@ -261,31 +658,168 @@ Check your account status: https://platform.openai.com/account/billing/overview
 def init_session_state():
     defaults = {
         "page": "main",
-        "paragraphs": [],
-        "saved_quizzes": {},
-        "current_quiz_index": None,
+        "current_paragraph_id": None,
         "user_answers": {},
         "show_results": False,
-        "quiz_history": [],
+        "attempt_id": None,      # Id the current attempt is recorded under on submit
+        "last_attempt": None,    # The recorded Attempt, shown on the results page
+        "quiz_history": None,  # Loaded from storage when first needed
+        "study_stats": None,   # Same
         "num_questions": 5,
-        "api_calls_made": 0,
-        "last_api_call": 0
+        "last_api_call": 0,
+        "favor_wrong": True,      # Sample questions answered wrongly more often
+        "generation_jobs": {},    # paragraph id -> job id
+        "top_up_jobs": set(),     # paragraph ids whose job adds to the pool
+        "prefetch": PREFETCH_CONFIG["default"],
+        "prefetch_pending": [],   # paragraph ids waiting for spare capacity to prefetch
+        "prefetch_jobs": set(),   # paragraph ids whose job is a prefetch
+        "generation_errors": {},  # paragraph id -> error message
+        "upload_key": 0,          # Bumped after an import to clear the file uploader
+        "import_report": None,    # (paragraphs added, {file name: error}) of the last import
+        "duplicate_offers": {}    # paragraph id -> (similarity, owner user id, paragraph id with a quiz)
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    
+    if "user_id" not in st.session_state:
+        load_user_data()
 
 init_session_state()
 
 # -------------------------
-# Page Configuration
+# Background Generation
 # -------------------------
-st.set_page_config(
-    page_title="📘 Smart Study Partner",
-    page_icon="📘",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+def start_generation(paragraph_id, use_cache=True):
+    """Queue generation of a paragraph's question pool without blocking the page"""
+    job_id = job_manager.submit(
+        engine.generate_cached,
+        st.session_state.paragraphs[paragraph_id].text,
+        max(POOL_CONFIG["size"], st.session_state.num_questions),
+        use_cache=use_cache,
+        label=paragraph_id
+    )
+    st.session_state.generation_jobs[paragraph_id] = job_id
+    st.session_state.top_up_jobs.discard(paragraph_id)
+    st.session_state.generation_errors.pop(paragraph_id, None)
+    st.session_state.duplicate_offers.pop(paragraph_id, None)
+
+def maybe_top_up(paragraph_id):
+    """Refill the pool in the background once it can't fill a quiz with unasked questions"""
+    pool = st.session_state.question_pools.get(paragraph_id)
+    if (not POOL_CONFIG["top_up"] or pool is None or pool.source == "local" or not engine.ready
+            or paragraph_id in st.session_state.generation_jobs
+            or pool.unasked() >= st.session_state.num_questions):
+        return
+    job_id = job_manager.submit(
+        engine.top_up,
+        st.session_state.paragraphs[paragraph_id].text,
+        POOL_CONFIG["top_up_size"],
+        [q.to_dict() for q in pool.questions],
+        label=paragraph_id
+    )
+    st.session_state.generation_jobs[paragraph_id] = job_id
+    st.session_state.top_up_jobs.add(paragraph_id)
+
+def cancel_generation(paragraph_id):
+    job_id = st.session_state.generation_jobs.pop(paragraph_id, None)
+    st.session_state.top_up_jobs.discard(paragraph_id)
+    st.session_state.prefetch_jobs.discard(paragraph_id)
+    if paragraph_id in st.session_state.prefetch_pending:
+        st.session_state.prefetch_pending.remove(paragraph_id)
+    if job_id:
+        job_manager.cancel(job_id)
+
+def cancel_all_generation():
+    for paragraph_id in list(st.session_state.generation_jobs):
+        cancel_generation(paragraph_id)
+    st.session_state.prefetch_pending = []
+    st.session_state.generation_errors = {}
+
+def generation_job(paragraph_id):
+    job_id = st.session_state.generation_jobs.get(paragraph_id)
+    return job_manager.get(job_id) if job_id else None
+
+def queue_prefetch(paragraph_id):
+    """Generate a new paragraph's quiz speculatively once there is spare capacity"""
+    st.session_state.prefetch_pending.append(paragraph_id)
+    run_prefetch()
+
+def prefetch_capacity():
+    """True while workers and the rate limiter have room beyond what users asked for"""
+    free_workers = JOB_CONFIG["max_workers"] - job_manager.active_count()
+    return (free_workers > PREFETCH_CONFIG["spare_workers"]
+            and rate_limiter.snapshot()["queue_depth"] <= PREFETCH_CONFIG["max_limiter_queue"])
+
+def run_prefetch():
+    """Start pending prefetches while there is capacity; the rest wait for a later run"""
+    waiting = []
+    for paragraph_id in st.session_state.prefetch_pending:
+        if (paragraph_id not in st.session_state.paragraphs
+                or paragraph_id in st.session_state.saved_quizzes
+                or paragraph_id in st.session_state.generation_jobs):
+            continue
+        if waiting or not prefetch_capacity():
+            waiting.append(paragraph_id)
+            continue
+        start_generation(paragraph_id)
+        st.session_state.prefetch_jobs.add(paragraph_id)
+    st.session_state.prefetch_pending = waiting
+
+def describe_job(job):
+    if job is None or job.status == QUEUED:
+        return "⏳ Waiting for a free generator..."
+    if job.status == RETRYING:
+        return job.message
+    return "🧠 Generating quiz..."
+
+def collect_generation_results():
+    """Move finished background quizzes into saved_quizzes"""
+    manager = job_manager
+    for paragraph_id, job_id in list(st.session_state.generation_jobs.items()):
+        job = manager.get(job_id)
+        if job is not None and not job.finished:
+            continue
+        
+        del st.session_state.generation_jobs[paragraph_id]
+        top_up = paragraph_id in st.session_state.top_up_jobs
+        st.session_state.top_up_jobs.discard(paragraph_id)
+        st.session_state.prefetch_jobs.discard(paragraph_id)
+        if job is None:
+            continue
+        manager.forget(job.id)
+        
+        # The paragraph may have been deleted meanwhile
+        if paragraph_id not in st.session_state.paragraphs:
+            continue
+        
+        if top_up:
+            # Failed top-ups stay quiet: the pool still serves quizzes
+            if job.status == DONE and job.result[0]:
+                if st.session_state.question_pools[paragraph_id].add(job.result[0]):
+                    save_pool(paragraph_id)
+                bump_counter("api_calls")
+            continue
+        
+        if job.status == DONE:
+            quiz, error, source = job.result
+            if error:
+                st.session_state.generation_errors[paragraph_id] = error
+            
+            current = st.session_state.saved_quizzes.get(paragraph_id)
+            if source == "local" and current is not None and current.source != "local":
+                # A failed Regenerate keeps the existing API quiz
+                continue
+            if quiz:
+                set_pool(paragraph_id, quiz, source=source)
+                if source == "api":
+                    bump_counter("api_calls")
+        elif job.status == FAILED:
+            st.session_state.generation_errors[paragraph_id] = f"❌ Unexpected error: {job.error}"
+
+collect_generation_results()
+if st.session_state.prefetch_pending:
+    run_prefetch()
 
 # -------------------------
 # CSS Styling - Dark Mode Only
@@ -435,6 +969,11 @@ with st.sidebar:
         st.session_state.page = "history"
         st.rerun()
     
+    if METRICS_CONFIG["admin_page"]:
+        if st.button("🛠️ Admin", use_container_width=True):
+            st.session_state.page = "admin"
+            st.rerun()
+    
     st.markdown("---")
     
     # Quick Stats
@@ -465,6 +1004,14 @@ with st.sidebar:
     st.subheader("⚙️ Settings")
     num_q = st.slider("Questions per quiz", 3, 10, st.session_state.num_questions)
     st.session_state.num_questions = num_q
+    st.session_state.prefetch = st.checkbox(
+        "🔮 Prefetch quizzes for new paragraphs", value=st.session_state.prefetch,
+        help="➕ Add Paragraph also starts generating its quiz in the background when the server has spare capacity."
+    )
+    st.session_state.favor_wrong = st.checkbox(
+        "🎯 Favor questions I missed", value=st.session_state.favor_wrong,
+        help="New draws from a paragraph's question pool bring back questions you answered wrongly more often."
+    )
     
     st.markdown("---")
     
@@ -473,30 +1020,23 @@ with st.sidebar:
     
     if st.button("🗑️ Clear All Data", use_container_width=True):
         if st.session_state.paragraphs or st.session_state.saved_quizzes:
-            st.session_state.paragraphs = []
-            st.session_state.saved_quizzes = {}
-            st.session_state.quiz_history = []
+            clear_paragraphs()
+            clear_quiz_history()
             st.success("🗑️ All data cleared!")
             st.rerun()
     
     if st.button("🔄 Reset Stats", use_container_width=True):
-        st.session_state.api_calls = 0
-        st.session_state.total_questions_answered = 0
-        st.session_state.total_correct_answers = 0
+        reset_counters()
         st.success("📊 Stats reset!")
         st.rerun()
     
     if st.session_state.saved_quizzes:
         if st.button("🎲 Random Quiz", use_container_width=True):
-            random_idx = random.choice(list(st.session_state.saved_quizzes.keys()))
-            st.session_state.current_quiz_index = random_idx
-            st.session_state.user_answers = {}
-            st.session_state.show_results = False
-            st.session_state.page = "quiz"
+            open_quiz(random.choice(list(st.session_state.saved_quizzes)))
             st.rerun()
     
     st.markdown("---")
-    st.caption("💡 Powered by OpenAI GPT-4o-mini")
+    st.caption(f"💡 Powered by {engine.label}")
 
 # -------------------------
 # MAIN PAGE
@@ -505,20 +1045,28 @@ if st.session_state.page == "main":
     st.title("📘 Quiz Generator")
     st.markdown("### Create intelligent quizzes from your study material")
     
+    if not engine.ready:
+        show_api_key_help()
+    
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     user_input = st.text_area(
         "📥 Paste Your Study Material",
         height=200,
-        placeholder="Enter your text here (max 2000 characters)...",
-        max_chars=2000
+        placeholder="Paste a paragraph, lecture notes or a whole chapter - long text is split automatically...",
+        max_chars=CHUNK_CONFIG["max_document_chars"]
     )
     
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("➕ Add Paragraph", use_container_width=True):
             if user_input and user_input.strip():
-                st.session_state.paragraphs.append(user_input.strip())
-                st.success("✅ Paragraph added!")
+                paragraph_id = add_paragraph(user_input.strip())
+                if find_duplicate(paragraph_id):
+                    st.success("♻️ Paragraph added - a very similar one already has a quiz you can reuse!")
+                else:
+                    if st.session_state.prefetch:
+                        queue_prefetch(paragraph_id)
+                    st.success("✅ Paragraph added!")
                 st.rerun()
             else:
                 st.warning("⚠️ Please enter some text first!")
@@ -526,30 +1074,47 @@ if st.session_state.page == "main":
     with col2:
         if st.button("⚡ Add & Generate", use_container_width=True):
             if user_input and user_input.strip():
-                st.session_state.paragraphs.append(user_input.strip())
-                idx = len(st.session_state.paragraphs) - 1
-                
-                with st.spinner("🧠 Generating quiz..."):
-                    quiz, error = generate_quiz(user_input.strip(), st.session_state.num_questions)
-                
-                if error:
-                    st.error(f"❌ {error}")
-                elif quiz:
-                    st.session_state.saved_quizzes[idx] = quiz
-                    st.session_state.api_calls += 1
-                    st.success(f"✅ Generated {len(quiz)} questions!")
-                    st.rerun()
+                paragraph_id = add_paragraph(user_input.strip())
+                if find_duplicate(paragraph_id):
+                    st.success("♻️ Paragraph added - a very similar one already has a quiz you can reuse!")
+                else:
+                    start_generation(paragraph_id)
+                    st.success("✅ Paragraph added - generating quiz in the background!")
+                st.rerun()
             else:
                 st.warning("⚠️ Please enter some text first!")
     
     with col3:
         if st.session_state.paragraphs:
             if st.button("🗑️ Clear All", use_container_width=True):
-                st.session_state.paragraphs = []
-                st.session_state.saved_quizzes = {}
+                clear_paragraphs()
                 st.success("🗑️ All cleared!")
                 st.rerun()
     
+    uploaded_files = st.file_uploader(
+        "📂 Or import files (TXT, Markdown, PDF) - split into paragraphs automatically",
+        type=[extension.lstrip(".") for extension in SUPPORTED_EXTENSIONS],
+        accept_multiple_files=True,
+        key=f"upload_{st.session_state.upload_key}"
+    )
+    if uploaded_files:
+        if st.button(f"📥 Import Files", use_container_width=True):
+            paragraph_ids, errors = import_files(uploaded_files)
+            for paragraph_id in paragraph_ids:
+                if not find_duplicate(paragraph_id) and st.session_state.prefetch:
+                    queue_prefetch(paragraph_id)
+            st.session_state.import_report = (len(paragraph_ids), errors)
+            st.session_state.upload_key += 1
+            st.rerun()
+    
+    if st.session_state.import_report is not None:
+        added, errors = st.session_state.import_report
+        st.session_state.import_report = None
+        if added:
+            st.success(f"✅ Imported {added} paragraph(s)!")
+        for name, error in errors.items():
+            st.warning(f"**{name}:** {error}")
+    
     st.markdown("</div>", unsafe_allow_html=True)
     
     # Saved paragraphs
@@ -557,62 +1122,130 @@ if st.session_state.page == "main":
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.subheader(f"📚 Saved Paragraphs ({len(st.session_state.paragraphs)})")
         
-        for i, para in enumerate(st.session_state.paragraphs):
+        generating = st.session_state.generation_jobs
+        if generating:
+            ready = len(st.session_state.saved_quizzes)
+            st.progress(
+                ready / len(st.session_state.paragraphs),
+                text=f"🧠 {len(generating)} quiz(zes) generating in the background - you can keep studying meanwhile"
+            )
+        
+        pending = [
+            pid for pid in st.session_state.paragraphs
+            if pid not in st.session_state.saved_quizzes and pid not in generating
+        ]
+        if pending:
+            if st.button(f"⚡ Generate All ({len(pending)} without quiz)", key="gen_all", use_container_width=True):
+                for pid in pending:
+                    start_generation(pid)
+                st.rerun()
+        
+        search, show = list_filters("paragraphs", "Search paragraphs...",
+                                    ["All", "With quiz", "Generating", "Without quiz"])
+        listed = [
+            (i, pid, paragraph) for i, (pid, paragraph) in enumerate(st.session_state.paragraphs.items())
+            if (not search or search in paragraph.text.lower())
+            and (show == "All"
+                 or show == "With quiz" and pid in st.session_state.saved_quizzes
+                 or show == "Generating" and pid in generating
+                 or show == "Without quiz" and pid not in st.session_state.saved_quizzes and pid not in generating)
+        ]
+        visible = paginate(listed, "paragraphs", PAGINATION_CONFIG["paragraphs_per_page"],
+                           total=len(st.session_state.paragraphs))
+        
+        # Widget keys use the paragraph id so they survive deletes of other paragraphs
+        for i, pid, paragraph in visible:
+            para = paragraph.text
             with st.expander(f"Paragraph {i+1} ({len(para)} characters)"):
                 st.markdown(f"{para[:300]}{'...' if len(para) > 300 else ''}")
                 
-                if i in st.session_state.saved_quizzes:
-                    st.success(f"✅ Quiz ready! ({len(st.session_state.saved_quizzes[i])} questions)")
+                if pid in st.session_state.saved_quizzes:
+                    pool = st.session_state.question_pools.get(pid)
+                    pool_note = f", {len(pool)} in the pool" if pool is not None else ""
+                    st.success(f"✅ Quiz ready! ({len(st.session_state.saved_quizzes[pid])} questions{pool_note})")
+                    
+                    if st.session_state.saved_quizzes[pid].source == "local":
+                        st.warning("📴 Built offline because the API was unavailable - Regenerate to try the API again.")
+                    if pid in st.session_state.generation_errors:
+                        # Expanders can't be nested, so a checkbox reveals the details
+                        if st.checkbox("Show why the API request failed", key=f"why_{pid}"):
+                            st.markdown(st.session_state.generation_errors[pid])
+                    
+                    refreshing = pid in st.session_state.generation_jobs and pid not in st.session_state.top_up_jobs
+                    if refreshing:
+                        st.caption("🔄 Regenerating in the background...")
+                    elif pid in st.session_state.top_up_jobs:
+                        st.caption("➕ Adding fresh questions to the pool in the background...")
                     
                     col1, col2, col3 = st.columns(3)
                     with col1:
-                        if st.button(f"📖 Take Quiz", key=f"take_{i}", use_container_width=True):
-                            st.session_state.current_quiz_index = i
-                            st.session_state.user_answers = {}
-                            st.session_state.show_results = False
-                            st.session_state.page = "quiz"
+                        if st.button(f"📖 Take Quiz", key=f"take_{pid}", use_container_width=True):
+                            open_quiz(pid)
                             st.rerun()
                     
                     with col2:
-                        if st.button(f"🔄 Regenerate", key=f"regen_{i}", use_container_width=True):
-                            del st.session_state.saved_quizzes[i]
-                            with st.spinner("🧠 Generating..."):
-                                quiz, error = generate_quiz(para, st.session_state.num_questions)
-                            
-                            if error:
-                                st.error(f"❌ {error}")
-                            elif quiz:
-                                st.session_state.saved_quizzes[i] = quiz
-                                st.session_state.api_calls += 1
-                                st.success(f"✅ New quiz generated!")
-                                st.rerun()
+                        if st.button(f"🔄 Regenerate", key=f"regen_{pid}", use_container_width=True,
+                                     disabled=refreshing):
+                            if pool is not None and pool.source != "local":
+                                # A new draw from the pool: instant, no API call
+                                resample_quiz(pid)
+                            else:
+                                # Offline quiz: try the API again, keeping this quiz until the new one arrives
+                                cancel_generation(pid)
+                                start_generation(pid, use_cache=False)
+                            st.rerun()
                     
                     with col3:
-                        if st.button(f"🗑️ Delete", key=f"del_{i}", use_container_width=True):
-                            del st.session_state.paragraphs[i]
-                            if i in st.session_state.saved_quizzes:
-                                del st.session_state.saved_quizzes[i]
+                        if st.button(f"🗑️ Delete", key=f"del_{pid}", use_container_width=True):
+                            delete_paragraph(pid)
                             st.success("🗑️ Deleted!")
                             st.rerun()
                 
+                elif pid in st.session_state.generation_jobs:
+                    job = generation_job(pid)
+                    ready = len(job.partial) if job is not None else 0
+                    prefix = "🔮 Prefetching · " if pid in st.session_state.prefetch_jobs else ""
+                    st.info(prefix + describe_job(job) + (f" {ready} question(s) ready." if ready else ""))
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        # Fixed label: a changing label would change the widget id between polls
+                        if st.button(f"📖 Start Now", key=f"start_{pid}", use_container_width=True,
+                                     disabled=ready == 0):
+                            open_quiz(pid)
+                            st.rerun()
+                    
+                    with col2:
+                        if st.button(f"✖️ Cancel", key=f"cancel_{pid}", use_container_width=True):
+                            cancel_generation(pid)
+                            st.rerun()
+                
                 else:
+                    if pid in st.session_state.generation_errors:
+                        st.error(f"❌ {st.session_state.generation_errors[pid]}")
+                    if pid in st.session_state.prefetch_pending:
+                        st.caption("🔮 Prefetch starts as soon as the server has a free generator.")
+                    if pid in st.session_state.duplicate_offers:
+                        similarity, owner_id, source_id = st.session_state.duplicate_offers[pid]
+                        match = (f'"{paragraph_label(source_id, 40)}"' if owner_id == st.session_state.user_id
+                                 else "material another student already studied")
+                        st.info(f"♻️ {similarity:.0%} similar to {match} - reuse its quiz instead of calling the API?")
+                        if st.button(f"♻️ Reuse Existing Quiz", key=f"reuse_{pid}", use_container_width=True):
+                            if not reuse_quiz(pid):
+                                st.session_state.generation_errors[pid] = (
+                                    "That quiz is no longer available - generate a new one instead."
+                                )
+                            st.rerun()
+                    
                     col1, col2 = st.columns(2)
                     with col1:
-                        if st.button(f"⚡ Generate Quiz", key=f"gen_{i}", use_container_width=True):
-                            with st.spinner("🧠 Generating quiz..."):
-                                quiz, error = generate_quiz(para, st.session_state.num_questions)
-                            
-                            if error:
-                                st.error(f"❌ {error}")
-                            elif quiz:
-                                st.session_state.saved_quizzes[i] = quiz
-                                st.session_state.api_calls += 1
-                                st.success(f"✅ Generated {len(quiz)} questions!")
-                                st.rerun()
+                        if st.button(f"⚡ Generate Quiz", key=f"gen_{pid}", use_container_width=True):
+                            start_generation(pid)
+                            st.rerun()
                     
                     with col2:
-                        if st.button(f"🗑️ Delete", key=f"del2_{i}", use_container_width=True):
-                            del st.session_state.paragraphs[i]
+                        if st.button(f"🗑️ Delete", key=f"del2_{pid}", use_container_width=True):
+                            delete_paragraph(pid)
                             st.success("🗑️ Deleted!")
                             st.rerun()
         
@@ -632,30 +1265,35 @@ elif st.session_state.page == "library":
     else:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.markdown(f"**Total Quizzes:** {len(st.session_state.saved_quizzes)}")
+        search, _ = list_filters("library", "Search quizzes by paragraph text...")
+        listed = [
+            (idx, pid, quiz) for idx, (pid, quiz) in enumerate(st.session_state.saved_quizzes.items())
+            if not search or pid in st.session_state.paragraphs
+            and search in st.session_state.paragraphs[pid].text.lower()
+        ]
+        visible = paginate(listed, "library", PAGINATION_CONFIG["quizzes_per_page"],
+                           total=len(st.session_state.saved_quizzes))
         st.markdown("</div>", unsafe_allow_html=True)
         
-        for idx, quiz in st.session_state.saved_quizzes.items():
-            para_preview = st.session_state.paragraphs[idx][:100] + "..."
+        for idx, pid, quiz in visible:
+            para_preview = paragraph_label(pid, 100)
             
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             col1, col2 = st.columns([3, 1])
             
             with col1:
                 st.markdown(f"### 📖 Quiz {idx+1}")
-                st.markdown(f"**Questions:** {len(quiz)}")
+                pool = st.session_state.question_pools.get(pid)
+                st.markdown(f"**Questions:** {len(quiz)}" + (f" (pool of {len(pool)})" if pool is not None else ""))
                 st.markdown(f"**Source:** {para_preview}")
             
             with col2:
-                if st.button(f"▶️ Take", key=f"lib_{idx}", use_container_width=True):
-                    st.session_state.current_quiz_index = idx
-                    st.session_state.user_answers = {}
-                    st.session_state.show_results = False
-                    st.session_state.page = "quiz"
+                if st.button(f"▶️ Take", key=f"lib_{pid}", use_container_width=True):
+                    open_quiz(pid)
                     st.rerun()
                 
-                if st.button(f"🗑️ Delete", key=f"libdel_{idx}", use_container_width=True):
-                    del st.session_state.saved_quizzes[idx]
-                    del st.session_state.paragraphs[idx]
+                if st.button(f"🗑️ Delete", key=f"libdel_{pid}", use_container_width=True):
+                    delete_paragraph(pid)
                     st.success("🗑️ Quiz deleted!")
                     st.rerun()
             
@@ -666,6 +1304,7 @@ elif st.session_state.page == "library":
 # -------------------------
 elif st.session_state.page == "stats":
     st.title("📊 Your Statistics")
+    stats = get_study_stats()
     
     accuracy = 0
     if st.session_state.total_questions_answered > 0:
@@ -692,7 +1331,7 @@ elif st.session_state.page == "stats":
     with col3:
         st.markdown(f"""
         <div class='stats-box'>
-            <div class='stats-number'>{len(st.session_state.quiz_history)}</div>
+            <div class='stats-number'>{stats.attempts}</div>
             <div class='stats-label'>Quizzes Taken</div>
         </div>
         """, unsafe_allow_html=True)
@@ -715,17 +1354,57 @@ elif st.session_state.page == "stats":
         </div>
         """, unsafe_allow_html=True)
     
-    if st.session_state.quiz_history:
+    if stats.attempts:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.subheader("📈 Performance Over Time")
         
-        scores = [h['percentage'] for h in st.session_state.quiz_history]
-        avg_score = sum(scores) / len(scores)
+        st.markdown(f"**Average Score:** {stats.average:.1f}%")
+        st.markdown(f"**Best Score:** {stats.best:.1f}%")
+        st.markdown(f"**Latest Score:** {stats.latest:.1f}%")
+        st.markdown(f"**Study Streak:** {stats.current_streak()} day(s) (longest {stats.longest_streak})")
+        
+        # Last 30 days from the per-day rollup
+        today = date.today()
+        days = [(today - timedelta(days=n)).isoformat() for n in range(29, -1, -1)]
+        st.bar_chart({"Quizzes": {day[5:]: stats.per_day.get(day, {}).get("attempts", 0) for day in days}})
         
-        st.markdown(f"**Average Score:** {avg_score:.1f}%")
-        st.markdown(f"**Best Score:** {max(scores):.1f}%")
-        st.markdown(f"**Latest Score:** {scores[-1]:.1f}%")
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        st.markdown("<div class='card'>", unsafe_allow_html=True)
+        st.subheader("📚 By Paragraph")
+        search, _ = list_filters("per_quiz", "Search by paragraph text...")
+        listed = [
+            (pid, quiz) for pid, quiz in sorted(stats.per_quiz.items(), key=lambda item: -item[1]["attempts"])
+            if not search or pid in st.session_state.paragraphs
+            and search in st.session_state.paragraphs[pid].text.lower()
+        ]
+        rows = paginate(listed, "per_quiz", PAGINATION_CONFIG["rows_per_page"], total=len(stats.per_quiz))
+        st.dataframe([
+            {
+                "Paragraph": paragraph_label(pid),
+                "Attempts": quiz["attempts"],
+                "Average %": round(quiz["percentage_sum"] / quiz["attempts"], 1),
+                "Best %": round(quiz["best"], 1),
+                "Latest %": round(quiz["latest"], 1)
+            }
+            for pid, quiz in rows
+        ], use_container_width=True, hide_index=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+    
+    health = http_client.health.snapshot()
+    if health["requests"]:
+        st.markdown("<div class='card'>", unsafe_allow_html=True)
+        st.subheader("🌐 API Connection")
+        st.markdown(f"**Status:** {'🟢 Healthy' if health['healthy'] else '🔴 Failing'}")
+        st.markdown(f"**Requests (server-wide):** {health['requests']} ({health['failures']} failed)")
+        st.markdown(f"**Connections opened:** {health['new_connections']}")
+        st.markdown(f"**Average latency:** {health['avg_latency']:.2f}s")
+        if health["last_error"]:
+            st.markdown(f"**Last error:** {health['last_error']}")
         
+        limiter = rate_limiter.snapshot()
+        st.markdown(f"**Requests waiting for a slot:** {limiter['queue_depth']}")
+        st.markdown(f"**Average / max wait:** {limiter['avg_wait']:.1f}s / {limiter['max_wait']:.1f}s")
         st.markdown("</div>", unsafe_allow_html=True)
 
 # -------------------------
@@ -733,37 +1412,118 @@ elif st.session_state.page == "stats":
 # -------------------------
 elif st.session_state.page == "history":
     st.title("📜 Quiz History")
+    quiz_history = get_quiz_history()
     
     if st.button("🏠 Go Home", use_container_width=True):
         st.session_state.page = "main"
         st.rerun()
     
-    if not st.session_state.quiz_history:
+    if not quiz_history:
         st.info("No quiz history yet. Take some quizzes to see your history!")
     else:
-        st.markdown(f"**Total Attempts:** {len(st.session_state.quiz_history)}")
+        st.markdown(f"**Total Attempts:** {get_study_stats().attempts}")
         
-        for i, record in enumerate(reversed(st.session_state.quiz_history)):
-            st.markdown(f"""
+        search, show = list_filters("history", "Search by quiz paragraph...",
+                                    ["All", "Passed (60%+)", "Below 60%"])
+        # Newest first; numbering follows the full history so it doesn't shift when filtering
+        listed = [
+            (number, record) for number, record in zip(range(len(quiz_history), 0, -1), reversed(quiz_history))
+            if (show == "All"
+                or show == "Passed (60%+)" and record.percentage >= 60
+                or show == "Below 60%" and record.percentage < 60)
+            and (not search or record.paragraph_id in st.session_state.paragraphs
+                 and search in st.session_state.paragraphs[record.paragraph_id].text.lower())
+        ]
+        visible = paginate(listed, "history", PAGINATION_CONFIG["attempts_per_page"], total=len(quiz_history))
+        
+        # One markdown element for the whole page instead of one per attempt
+        st.markdown("".join(f"""
             <div class='history-item'>
-                <h4>📝 Attempt #{len(st.session_state.quiz_history) - i}</h4>
-                <p><strong>Date:</strong> {record['date']}</p>
-                <p><strong>Quiz:</strong> Quiz {record['quiz_index'] + 1}</p>
-                <p><strong>Score:</strong> {record['score']}/{record['total']} ({record['percentage']:.1f}%)</p>
+                <h4>📝 Attempt #{number}</h4>
+                <p><strong>Date:</strong> {record.date}</p>
+                <p><strong>Quiz:</strong> {html.escape(paragraph_label(record.paragraph_id))}</p>
+                <p><strong>Score:</strong> {record.score}/{record.total} ({record.percentage:.1f}%)</p>
             </div>
-            """, unsafe_allow_html=True)
+            """ for number, record in visible), unsafe_allow_html=True)
+
+# -------------------------
+# ADMIN PAGE
+# -------------------------
+elif st.session_state.page == "admin" and METRICS_CONFIG["admin_page"]:
+    st.title("🛠️ API Request Metrics")
+    st.caption("Server-wide numbers for every request sent to the model API since the app started.")
+    if GENERATION_CONFIG["service_url"]:
+        st.info(f"🛰️ Quizzes are generated by the {engine.label}; "
+                f"its numbers are at {GENERATION_CONFIG['service_url'].rstrip('/')}/metrics")
+    metrics = request_metrics.snapshot()
+    
+    if not metrics["requests"]:
+        st.info("No API requests yet. Generate a quiz to see numbers here.")
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Requests", metrics["requests"])
+        col2.metric("Retries", metrics["retries"])
+        col3.metric("Prompt tokens", metrics["tokens"].get("prompt", 0))
+        col4.metric("Completion tokens", metrics["tokens"].get("completion", 0))
+        
+        st.markdown(f"**Status codes:** {', '.join(f'{k}: {v}' for k, v in sorted(metrics['statuses'].items()))}")
+        if metrics["parse_outcomes"]:
+            st.markdown(f"**Parse outcomes:** "
+                        f"{', '.join(f'{k}: {v}' for k, v in sorted(metrics['parse_outcomes'].items()))}")
+        
+        st.subheader("⏱️ Timings")
+        averages = metrics["averages"]
+        cols = st.columns(len(averages))
+        for col, (name, value) in zip(cols, averages.items()):
+            col.metric(f"Avg {name.replace('_', ' ')}", f"{value:.3f}s")
+        
+        timing = st.selectbox("Histogram", list(metrics["histograms"]))
+        buckets = metrics["histograms"][timing]
+        previous = 0
+        counts = {}
+        for bound, cumulative in buckets:
+            counts["+Inf" if bound == float("inf") else f"≤{bound:g}s"] = cumulative - previous
+            previous = cumulative
+        st.bar_chart({"requests": counts})
+        st.caption(" · ".join(f"{label}: {count}" for label, count in counts.items()))
+        
+        flights = in_flight.snapshot()
+        st.markdown(f"**Coalesced:** {flights['shared']} requests joined one already in flight "
+                    f"({flights['leaders']} led, {flights['in_flight']} running now)")
+        
+        st.subheader("🧾 Recent Requests")
+        st.dataframe(list(reversed(metrics["recent"])), use_container_width=True)
+    
+    st.download_button("⬇️ Prometheus metrics", request_metrics.prometheus_text(),
+                       file_name="metrics.prom", mime="text/plain")
 
 # -------------------------
 # QUIZ PAGE
 # -------------------------
 elif st.session_state.page == "quiz":
-    if st.session_state.current_quiz_index is None:
+    if st.session_state.current_paragraph_id is None:
         st.warning("⚠️ No quiz selected.")
         if st.button("🏠 Go Home"):
             st.session_state.page = "main"
             st.rerun()
     else:
-        quiz = st.session_state.saved_quizzes[st.session_state.current_quiz_index]
+        paragraph_id = st.session_state.current_paragraph_id
+        saved = st.session_state.saved_quizzes.get(paragraph_id)
+        quiz = saved.questions if saved is not None else None
+        still_generating = False
+        
+        if quiz is None and paragraph_id in st.session_state.generation_jobs:
+            # Quiz is still streaming in: show the questions received so far
+            job = generation_job(paragraph_id)
+            quiz = [Question.from_dict(q) for q in job.partial[:st.session_state.num_questions]] if job is not None else []
+            still_generating = True
+        
+        if quiz is None:
+            st.warning("⚠️ This quiz is no longer available.")
+            if st.button("🏠 Go Home", key="quiz_missing_home"):
+                st.session_state.page = "main"
+                st.rerun()
+            st.stop()
         
         col_main, col_side = st.columns([3, 1])
         
@@ -777,23 +1537,24 @@ elif st.session_state.page == "quiz":
                 <div class='stats-label'>Answered</div>
             </div>
             """, unsafe_allow_html=True)
-            st.progress(answered / len(quiz))
+            st.progress(answered / len(quiz) if quiz else 0.0)
             
-            if st.button("✅ Submit", use_container_width=True, disabled=(answered < len(quiz))):
+            if st.button("✅ Submit", use_container_width=True,
+                         disabled=(still_generating or answered < len(quiz) or st.session_state.show_results)):
+                submit_attempt(paragraph_id, saved)
                 st.session_state.show_results = True
                 st.rerun()
             
             if st.button("🔄 Reset", use_container_width=True):
-                st.session_state.user_answers = {}
-                st.session_state.show_results = False
+                start_attempt()
                 st.rerun()
             
-            if st.button("🏠 Home", use_container_width=True):
+            if st.button("🏠 Home", key="quiz_home", use_container_width=True):
                 st.session_state.page = "main"
                 st.session_state.show_results = False
                 st.rerun()
             
-            if st.button("📚 My Quizzes", use_container_width=True):
+            if st.button("📚 My Quizzes", key="quiz_lib", use_container_width=True):
                 st.session_state.page = "library"
                 st.session_state.show_results = False
                 st.rerun()
@@ -801,19 +1562,22 @@ elif st.session_state.page == "quiz":
         with col_main:
             if not st.session_state.show_results:
                 st.title("🎮 Quiz Time!")
-                st.info("💡 Retake unlimited times - no extra API calls!")
+                if still_generating:
+                    st.info(f"🧠 {len(quiz)} question(s) ready - more are on the way...")
+                else:
+                    st.info("💡 Retake unlimited times - no extra API calls!")
                 
                 for i, q in enumerate(quiz):
                     st.markdown(f"<div class='question-box'>", unsafe_allow_html=True)
                     st.markdown(f"**Question {i+1}**")
-                    st.markdown(f"### {q['question']}")
+                    st.markdown(f"### {q.question}")
                     
                     current = st.session_state.user_answers.get(i)
                     
                     answer = st.radio(
                         "Select:",
-                        options=q["options"],
-                        index=None if current is None else q["options"].index(current),
+                        options=q.options,
+                        index=None if current is None else q.options.index(current),
                         key=f"radio_{i}",
                         label_visibility="collapsed"
                     )
@@ -827,15 +1591,15 @@ elif st.session_state.page == "quiz":
             else:
                 st.title("📊 Results")
                 
-                score = 0
-                total = len(quiz)
+                # Recorded once on submit; reruns while results are shown only display it
+                attempt = submit_attempt(paragraph_id, saved)
+                score = attempt.score
+                total = attempt.total
+                percentage = attempt.percentage
                 
                 for i, q in enumerate(quiz):
                     user_ans = st.session_state.user_answers.get(i)
-                    correct_ans = q["answer"]
-                    
-                    if user_ans == correct_ans:
-                        score += 1
+                    correct_ans = q.answer
                     
                     st.markdown(f"<div class='question-box'>", unsafe_allow_html=True)
                     
@@ -844,33 +1608,18 @@ elif st.session_state.page == "quiz":
                     else:
                         st.error(f"❌ Question {i+1}: Incorrect")
                     
-                    st.markdown(f"**{q['question']}**")
+                    st.markdown(f"**{q.question}**")
                     st.markdown(f"**Your answer:** {user_ans if user_ans else 'No answer'}")
                     
                     if user_ans != correct_ans:
                         st.markdown(f"**Correct answer:** {correct_ans}")
                     
-                    if "explanation" in q:
+                    if q.explanation:
                         with st.expander("💡 Explanation"):
-                            st.info(q["explanation"])
+                            st.info(q.explanation)
                     
                     st.markdown("</div>", unsafe_allow_html=True)
                 
-                percentage = (score / total) * 100
-                
-                # Update global stats
-                st.session_state.total_questions_answered += total
-                st.session_state.total_correct_answers += score
-                
-                # Add to history
-                st.session_state.quiz_history.append({
-                    'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                    'quiz_index': st.session_state.current_quiz_index,
-                    'score': score,
-                    'total': total,
-                    'percentage': percentage
-                })
-                
                 if percentage >= 80:
                     emoji = "🏆"
                     message = "Excellent!"
@@ -893,8 +1642,7 @@ elif st.session_state.page == "quiz":
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button("🔄 Retake", use_container_width=True):
-                        st.session_state.user_answers = {}
-                        st.session_state.show_results = False
+                        start_attempt()
                         st.rerun()
                 
                 with col2:
@@ -908,56 +1656,13 @@ elif st.session_state.page == "quiz":
                         st.session_state.page = "main"
                         st.session_state.show_results = False
                         st.rerun()
+
 # -------------------------
-# HISTORY PAGE
+# Poll Background Generation
 # -------------------------
-elif st.session_state.page == "history":
-    st.title("📊 Quiz History")
-    if not st.session_state.quiz_history:
-        st.markdown("<div class='card'>", unsafe_allow_html=True)
-        st.info("📝 No quiz history yet. Complete a quiz to see your progress!")
-        if st.button("🏠 Go to Home", key="history_home", use_container_width=True):
-            st.session_state.page = "main"
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
-    else:
-        st.markdown("<div class='card'>", unsafe_allow_html=True)
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.markdown(f"""
-            <div class='stats-box'>
-                <div class='stats-number'>{len(st.session_state.quiz_history)}</div>
-                <div class='stats-label'>Total Attempts</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col2:
-            avg = sum(h["score"] for h in st.session_state.quiz_history) / len(st.session_state.quiz_history)
-            st.markdown(f"""
-            <div class='stats-box'>
-                <div class='stats-number'>{avg:.1f}%</div>
-                <div class='stats-label'>Average Score</div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col3:
-            best = max(h["score"] for h in st.session_state.quiz_history)
-            st.markdown(f"""
-            <div class='stats-box'>
-                <div class='stats-number'>{best:.1f}%</div>
-                <div class='stats-label'>Best Score</div>
-            </div>
-            """, unsafe_allow_html=True)
-        st.markdown("### Recent Attempts")
-        for i, rec in enumerate(reversed(st.session_state.quiz_history)):
-            idx = len(st.session_state.quiz_history) - i
-            with st.expander(f"Attempt {idx} - {rec['date']} - Score: {rec['score']:.1f}%"):
-                st.markdown(f"**Quiz:** Paragraph {rec.get('quiz_index', 'Unknown') + 1}")
-                st.markdown(f"**Score:** {rec['correct']}/{rec['total']} ({rec['score']:.1f}%)")
-                st.progress(rec['score'] / 100)
-        if st.button("🗑️ Clear History", key="clear_history", use_container_width=True):
-            st.session_state.quiz_history = []
-            st.success("History cleared!")
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
-
-
-
+# Rerun shortly while this session has quizzes in flight (or prefetches waiting
+# for capacity) so results show up without a click; any user interaction simply
+# starts the next run sooner.
+if st.session_state.generation_jobs or st.session_state.prefetch_pending:
+    time.sleep(JOB_CONFIG["poll_interval"])
+    st.rerun()
@@ -0,0 +1,220 @@
+"""Load test for the generation path and the page render path.
+
+Starts the mock OpenAI server, points the app at it and lets N simulated
+users go through add paragraph -> generate -> take quiz -> submit at the
+same time (each user is a Streamlit AppTest session). Reports
+p50/p95/p99 for page renders and for time-to-quiz, throughput, what the
+server served (429s, malformed replies, requests per quiz) and memory per
+session. While a quiz is generating, the page sleeps for
+JOB_CONFIG["poll_interval"] before it reruns, and that sleep is part of
+the measured render time.
+
+    python benchmarks/load_test.py --users 20 --latency 0.5 --rate-429 0.1 --malformed 0.05
+
+Save runs with --json and compare them before and after a change.
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from mock_openai import MockOpenAIServer  # noqa: E402
+
+TOPICS = ["photosynthesis", "plate tectonics", "the French Revolution", "cell division", "supply and demand",
+          "the water cycle", "Newton's laws", "the immune system", "volcanoes", "the Roman Empire"]
+
+
+TERMS = ["energy", "pressure", "structure", "balance", "growth", "movement", "pattern", "source", "signal",
+         "surface", "current", "boundary", "network", "response", "process", "element", "climate", "record",
+         "measure", "factor", "sample", "method", "theory", "model"]
+
+
+def study_text(user):
+    """A different paragraph per user, so the quiz cache doesn't hide the API.
+
+    Every sentence brings its own terms, so there is enough distinct material
+    for a full question pool without reworded repeats.
+    """
+    topic = TOPICS[user % len(TOPICS)]
+    return " ".join(
+        f"Fact {k} about {topic} for learner {user}: researchers link {TERMS[4 * k]} and {TERMS[4 * k + 1]} "
+        f"through {TERMS[4 * k + 2]} shaped by {TERMS[4 * k + 3]}."
+        for k in range(6)
+    )
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux (bytes on macOS); good enough for a trend
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# AppTest swaps a process-wide Streamlit runtime in and out for each run, so
+# runs from different users must not overlap. Page renders are therefore
+# serialized; quiz generation still runs concurrently on the app's workers.
+_RUN_LOCK = threading.Lock()
+
+
+class SimulatedUser:
+    """One browser session driven through the app with AppTest"""
+
+    def __init__(self, number, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.timeout = timeout
+        self.at = AppTest.from_file(os.path.join(APP_DIR, "Main.py"), default_timeout=timeout)
+        self.render_times = []
+        self.time_to_quiz = None
+        self.completed = False
+        self.error = None
+
+    def run(self):
+        with _RUN_LOCK:
+            start = time.perf_counter()
+            self.at.run()
+            self.render_times.append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].value)
+
+    def click(self, label):
+        buttons = [button for button in self.at.button if button.label.startswith(label)]
+        if not buttons:
+            raise RuntimeError(f"No button {label!r} on page {self.at.session_state.page!r}")
+        buttons[0].click()
+        self.run()
+
+    def session_bytes(self):
+        state = self.at.session_state.filtered_state
+        return len(pickle.dumps({key: value for key, value in state.items()}))
+
+    def go(self):
+        try:
+            self.run()
+            self.at.text_area[0].input(study_text(self.number))
+            started = time.perf_counter()
+            self.click("⚡ Add & Generate")
+
+            deadline = started + self.timeout
+            while self.at.session_state.generation_jobs and time.perf_counter() < deadline:
+                self.run()
+            if not self.at.session_state.saved_quizzes:
+                errors = list(self.at.session_state.generation_errors.values())
+                raise RuntimeError(errors[0] if errors else "quiz not ready before timeout")
+            self.time_to_quiz = time.perf_counter() - started
+
+            self.click("📖 Take Quiz")
+            for radio in self.at.radio:
+                radio.set_value(radio.options[0])
+            self.run()
+            self.click("✅ Submit")
+            self.completed = self.at.session_state.show_results
+        except Exception as e:
+            self.error = str(e)
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=0, help="users active at once (default: all)")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=6000, help="client-side limiter budget")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", help="write the report to this file as well")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="quiz-bench-")
+    server = MockOpenAIServer(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                              malformed_rate=args.malformed).start()
+    os.environ.update({
+        "QUIZ_PROVIDER": "openai_compatible",
+        "QUIZ_PROVIDER_URL": server.url,
+        "QUIZ_RPM": str(args.rpm),
+        "QUIZ_MIN_DELAY": "0",
+        "STUDY_DATA_DIR": data_dir,
+    })
+
+    import streamlit as st
+    # Buttons call st.rerun(); under AppTest that replays the click forever,
+    # so end the run instead and let the driver start the next one.
+    st.rerun = st.stop
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    users = [SimulatedUser(n, args.timeout) for n in range(args.users)]
+    with ThreadPoolExecutor(max_workers=args.concurrency or args.users) as pool:
+        list(pool.map(SimulatedUser.go, users))
+    elapsed = time.perf_counter() - started
+
+    server.stop()
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    done = [user for user in users if user.completed]
+    served = server.stats.snapshot()
+    report = {
+        "users": args.users,
+        "completed": len(done),
+        "failed": [user.error for user in users if user.error],
+        "elapsed_s": elapsed,
+        "throughput_quizzes_per_s": len(done) / elapsed if elapsed else 0.0,
+        "time_to_quiz_s": summarize([user.time_to_quiz for user in users if user.time_to_quiz is not None]),
+        "page_render_s": summarize([t for user in users for t in user.render_times]),
+        "server": served,
+        "rate_limited": served["rate_limited"],
+        # Includes re-requests after 429s and malformed replies, and follow-ups for short replies
+        "requests_per_quiz": served["requests"] / len(done) if done else 0.0,
+        "session_state_kb": sum(user.session_bytes() for user in users) / len(users) / 1024 if users else 0,
+        "rss_growth_mb_per_session": max(0.0, rss_mb() - rss_before) / max(1, len(users)),
+        "threads_alive": threading.active_count(),
+    }
+
+    print(f"Users: {report['users']}  completed: {report['completed']}  elapsed: {elapsed:.1f}s  "
+          f"throughput: {report['throughput_quizzes_per_s']:.2f} quizzes/s")
+    for name in ("time_to_quiz_s", "page_render_s"):
+        stats = report[name]
+        print(f"{name:15} n={stats['count']:<5} p50={stats['p50']:.3f}  p95={stats['p95']:.3f}  "
+              f"p99={stats['p99']:.3f}  max={stats['max']:.3f}")
+    print(f"Server: {served}  requests per quiz: {report['requests_per_quiz']:.2f}")
+    print(f"Memory: {report['session_state_kb']:.1f} KiB session state, "
+          f"{report['rss_growth_mb_per_session']:.2f} MiB RSS growth per session")
+    for error in report["failed"][:5]:
+        print(f"  failed: {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
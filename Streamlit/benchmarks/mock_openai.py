@@ -0,0 +1,192 @@
+"""Mock OpenAI chat-completions server for benchmarks and load tests.
+
+Speaks enough of POST /v1/chat/completions (plain and streamed) for the
+app to run against it. Latency, the share of 429 replies and the share of
+malformed replies are configurable, and the server counts what it served.
+
+    python benchmarks/mock_openai.py --port 8765 --latency 0.5 --rate-429 0.1
+
+then start the app with QUIZ_PROVIDER=openai_compatible and
+QUIZ_PROVIDER_URL=http://127.0.0.1:8765/v1.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quizgen.providers import FakeProvider  # noqa: E402
+
+
+class MockStats:
+    """Counters for what the server has served"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.ok = 0
+        self.rate_limited = 0
+        self.malformed = 0
+
+    def record(self, outcome):
+        with self._lock:
+            self.requests += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "ok": self.ok,
+                "rate_limited": self.rate_limited,
+                "malformed": self.malformed,
+            }
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop kept-alive sockets whenever they like (e.g. after a 429)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockOpenAIServer:
+    """Threaded mock server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.0, rate_429=0.0,
+                 malformed_rate=0.0, chunk_delay=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.malformed_rate = malformed_rate
+        self.chunk_delay = chunk_delay
+        self.stats = MockStats()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._generator = FakeProvider(seed=seed)
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self):
+        with self._rng_lock:
+            return self._rng.random(), self._rng.random(), self._rng.uniform(-self.jitter, self.jitter)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                throttle, broken, jitter = server._roll()
+
+                if throttle < server.rate_429:
+                    self._send_json(429, {"error": {"message": "Rate limit reached (mock)"}}, {"Retry-After": "1"})
+                    server.stats.record("rate_limited")
+                    return
+
+                time.sleep(max(0.0, server.latency + jitter))
+                prompt = body["messages"][-1]["content"]
+                content = json.dumps({"quiz": server._generator.make_questions(prompt)})
+                outcome = "ok"
+                if broken < server.malformed_rate:
+                    # Cut the reply off mid-way, like a completion that hit max_tokens
+                    content = "Here is your quiz:\n```json\n" + content[:len(content) // 2]
+                    outcome = "malformed"
+
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+                if body.get("stream"):
+                    self._send_stream(content, usage if (body.get("stream_options") or {}).get("include_usage") else None)
+                else:
+                    self._send_json(200, {
+                        "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                server.stats.record(outcome)
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, content, usage=None):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(content), 40):
+                    event = {"choices": [{"delta": {"content": content[start:start + 40]}}]}
+                    self._write_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                if usage:
+                    self._write_chunk(b"data: " + json.dumps({"choices": [], "usage": usage}).encode("utf-8") + b"\n\n")
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds added to the latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--malformed", type=float, default=0.0, help="share of replies cut off mid-JSON")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.jitter, args.rate_429,
+                              args.malformed, args.chunk_delay)
+    print(f"Mock OpenAI listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.snapshot()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Import study material from uploaded TXT, Markdown and PDF files.
+
+Files are read incrementally: text files in blocks through an incremental
+decoder, PDFs one page at a time (PDF support needs the optional pypdf
+package). Each page is normalized and fed to a paragraph splitter that
+carries unfinished paragraphs across page boundaries, so only the current
+page and paragraph are held in memory, not the whole extracted text.
+"""
+import codecs
+import os
+import re
+import unicodedata
+
+TEXT_EXTENSIONS = (".txt", ".text")
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+PDF_EXTENSIONS = (".pdf",)
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + MARKDOWN_EXTENSIONS + PDF_EXTENSIONS
+
+READ_BLOCK_BYTES = 64 * 1024
+MAX_PAGE_CHARS = 64 * 1024   # Text without line breaks is cut at a space beyond this
+
+_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+_SPACES = re.compile(r"[ \t]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+")
+_MD_LIST = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_MD_QUOTE = re.compile(r"^\s*>\s?")
+_MD_RULE = re.compile(r"^\s*(?:[-*_]\s*){3,}$")
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_EMPHASIS = re.compile(r"(\*\*|__|\*|_|`)(?=\S)(.+?)(?<=\S)\1")
+_MD_HTML = re.compile(r"</?[A-Za-z][^>]*>")
+
+
+class IngestionError(ValueError):
+    """A file that can't be imported, with a message fit for the user"""
+
+
+def file_kind(name):
+    """Classify a file by its extension as text, markdown or pdf"""
+    extension = os.path.splitext(name.lower())[1]
+    if extension in TEXT_EXTENSIONS:
+        return "text"
+    if extension in MARKDOWN_EXTENSIONS:
+        return "markdown"
+    if extension in PDF_EXTENSIONS:
+        return "pdf"
+    raise IngestionError(f"Unsupported file type: {name} (use {', '.join(SUPPORTED_EXTENSIONS)})")
+
+
+# -------------------------
+# Extraction
+# -------------------------
+def iter_text_pages(file, encoding="utf-8"):
+    """Decoded text of a binary file object, one block at a time.
+
+    Blocks end on a line break where possible so the normalizer never sees
+    half a line; a line longer than MAX_PAGE_CHARS is cut at a space instead,
+    so text without line breaks is not collected into one huge block.
+    Undecodable bytes are replaced instead of failing the import.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    first = True
+    carry = ""
+    while True:
+        block = file.read(READ_BLOCK_BYTES)
+        text = carry + decoder.decode(block or b"", final=not block)
+        if first:
+            text = text.lstrip("\ufeff")
+            first = False
+        if not block:
+            if text:
+                yield text
+            return
+        cut = text.rfind("\n") + 1
+        if not cut and len(text) > MAX_PAGE_CHARS:
+            cut = max(text.rfind(" "), text.rfind("\t")) + 1 or len(text)
+        carry = text[cut:]
+        if cut:
+            yield text[:cut]
+
+
+def iter_pdf_pages(file):
+    """Extracted text of each PDF page, in order"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise IngestionError("📄 PDF import needs the pypdf package: pip install pypdf")
+
+    try:
+        reader = PdfReader(file)
+        if reader.is_encrypted:
+            raise IngestionError("🔒 This PDF is password protected.")
+        for page in reader.pages:
+            yield (page.extract_text() or "") + "\n"
+    except IngestionError:
+        raise
+    except Exception as e:
+        # Corrupt files make pypdf fail in many ways besides PdfReadError (KeyError,
+        # ValueError, TypeError, ...); any of them only fails this one file
+        raise IngestionError(f"❌ Could not read this PDF: {str(e) or type(e).__name__}")
+
+
+class MarkdownStripper:
+    """Markdown source to plain prose: markup goes, the words stay.
+
+    Fed page by page; remembers whether a code fence is open across pages,
+    since code is not study material and is dropped.
+    """
+
+    def __init__(self):
+        self.in_fence = False
+
+    def feed(self, text):
+        lines = []
+        for line in text.split("\n"):
+            if _MD_FENCE.match(line):
+                self.in_fence = not self.in_fence
+                lines.append("")
+                continue
+            if self.in_fence or _MD_RULE.match(line):
+                lines.append("")
+                continue
+            heading = _MD_HEADING.match(line)
+            line = _MD_HEADING.sub("", line)
+            line = _MD_QUOTE.sub("", line)
+            line = _MD_LIST.sub("", line)
+            line = _MD_IMAGE.sub(r"\1", line)
+            line = _MD_LINK.sub(r"\1", line)
+            line = _MD_EMPHASIS.sub(r"\2", line)
+            line = _MD_HTML.sub("", line)
+            if heading:
+                # A heading is a piece of its own, so the splitter (headings being
+                # short) merges it into the start of the paragraph below
+                lines.extend(["", line, ""])
+            else:
+                lines.append(line)
+        return "\n".join(lines)
+
+
+def normalize_page(text):
+    """Unicode-normalize, drop control characters, re-join hyphenated line breaks
+    and tidy whitespace; paragraph breaks (blank lines) are kept"""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\f", "\n\n")
+    text = _CONTROL.sub("", text)
+    text = _HYPHEN_BREAK.sub(r"\1\2", text)
+    return "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+
+
+# -------------------------
+# Paragraphs
+# -------------------------
+def split_long(text, max_chars):
+    """Split text longer than max_chars at sentence ends (or words, as a last resort)"""
+    if len(text) <= max_chars:
+        return [text]
+    parts = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+class ParagraphSplitter:
+    """Turns a stream of normalized pages into paragraphs.
+
+    Paragraphs end at blank lines. Pieces shorter than min_chars (headings,
+    captions, page numbers) are merged into the following paragraph, and
+    paragraphs longer than max_chars are split at sentence ends.
+    """
+
+    def __init__(self, min_chars=80, max_chars=4000):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._lines = []
+        self._pending = ""  # A short piece waiting to be merged into the next paragraph
+        self._emitted = 0
+
+    def feed(self, page):
+        """Add a page; returns the paragraphs it completed"""
+        done = []
+        lines = page.split("\n")
+        if page.endswith("\n"):
+            lines.pop()  # The final line break ends a line, not the paragraph
+        for line in lines:
+            if line:
+                self._lines.append(line)
+            elif self._lines:
+                done.extend(self._flush())
+        return done
+
+    def close(self):
+        """Paragraphs left at the end of the document"""
+        done = self._flush() if self._lines else []
+        # A short tail (page number, closing remark) is noise, unless it is all there is
+        if self._pending and not (self._emitted or done):
+            done.append(self._pending)
+        self._pending = ""
+        return done
+
+    def _flush(self):
+        text = " ".join(self._lines)
+        self._lines = []
+        if self._pending:
+            text = f"{self._pending} {text}"
+            self._pending = ""
+        if len(text) < self.min_chars:
+            self._pending = text
+            return []
+        parts = split_long(text, self.max_chars)
+        self._emitted += len(parts)
+        return parts
+
+
+def iter_paragraphs(file, name, min_chars=80, max_chars=4000):
+    """Paragraph texts of an uploaded file, extracted page by page"""
+    kind = file_kind(name)
+    pages = iter_pdf_pages(file) if kind == "pdf" else iter_text_pages(file)
+    splitter = ParagraphSplitter(min_chars=min_chars, max_chars=max_chars)
+    markdown = MarkdownStripper() if kind == "markdown" else None
+    for page in pages:
+        if markdown is not None:
+            page = markdown.feed(page)
+        yield from splitter.feed(normalize_page(page))
+    yield from splitter.close()
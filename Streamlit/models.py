@@ -0,0 +1,174 @@
+"""Data model for paragraphs, quizzes, questions and quiz attempts.
+
+Every record has a stable id (a UUID hex string), so collections are keyed
+by id instead of list position and deleting one item never re-points
+another item's quiz or history.
+"""
+import hashlib
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from quizgen.quiz_cache import normalize_text
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+@dataclass(slots=True)
+class Question:
+    question: str
+    options: list
+    answer: str
+    explanation: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            question=data["question"],
+            options=list(data["options"]),
+            answer=data["answer"],
+            explanation=data.get("explanation", ""),
+        )
+
+    @property
+    def key(self):
+        """Normalized question text, used to recognize the same question again"""
+        return " ".join(self.question.lower().split())
+
+    def to_dict(self):
+        return {
+            "question": self.question,
+            "options": list(self.options),
+            "answer": self.answer,
+            "explanation": self.explanation,
+        }
+
+
+@dataclass(slots=True)
+class Paragraph:
+    id: str
+    text: str
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, text):
+        return cls(id=new_id(), text=text)
+
+    @property
+    def content_hash(self):
+        """Hash of the normalized text, identical for identical material"""
+        return hashlib.sha256(normalize_text(self.text).encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
+class Quiz:
+    id: str
+    paragraph_id: str
+    questions: list
+    created_at: float = field(default_factory=time.time)
+    source: str = "api"  # "api", "cache", "shared" or "local" (offline fallback generator)
+
+    @classmethod
+    def create(cls, paragraph_id, questions, source="api"):
+        """Build a quiz from generator output (question dicts)"""
+        return cls(
+            id=new_id(),
+            paragraph_id=paragraph_id,
+            questions=[q if isinstance(q, Question) else Question.from_dict(q) for q in questions],
+            source=source,
+        )
+
+    def __len__(self):
+        return len(self.questions)
+
+
+@dataclass(slots=True)
+class QuestionPool:
+    """All questions generated for a paragraph; quizzes are sampled from it"""
+    paragraph_id: str
+    questions: list
+    stats: dict = field(default_factory=dict)  # question key -> [times asked, times wrong]
+    source: str = "api"
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, paragraph_id, questions, source="api"):
+        pool = cls(paragraph_id=paragraph_id, questions=[], source=source)
+        pool.add(questions)
+        return pool
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, questions):
+        """Add generator output, skipping questions already in the pool; returns how many were new"""
+        known = {q.key for q in self.questions}
+        added = 0
+        for q in questions:
+            q = q if isinstance(q, Question) else Question.from_dict(q)
+            if q.key not in known:
+                known.add(q.key)
+                self.questions.append(q)
+                added += 1
+        return added
+
+    def record(self, question, correct):
+        asked, wrong = self.stats.get(question.key, (0, 0))
+        self.stats[question.key] = [asked + 1, wrong + (0 if correct else 1)]
+
+    def unasked(self):
+        return sum(1 for q in self.questions if q.key not in self.stats)
+
+    def sample(self, n, favor_wrong=True, wrong_weight=3.0, exclude=(), rng=None):
+        """Draw n questions; unasked and (optionally) missed questions come up more often.
+
+        Questions whose key is in exclude (e.g. the current quiz) are only
+        used when the rest of the pool is too small.
+        """
+        rng = rng or random
+
+        def weight(q):
+            asked, wrong = self.stats.get(q.key, (0, 0))
+            w = 2.0 if asked == 0 else 1.0
+            if favor_wrong:
+                w += wrong_weight * wrong
+            return w
+
+        def ranked(questions):
+            # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+            return sorted(questions, key=lambda q: rng.random() ** (1.0 / weight(q)), reverse=True)
+
+        fresh = [q for q in self.questions if q.key not in exclude]
+        seen = [q for q in self.questions if q.key in exclude]
+        return (ranked(fresh) + ranked(seen))[:n]
+
+
+@dataclass(slots=True)
+class Attempt:
+    id: str
+    quiz_id: str
+    paragraph_id: str
+    score: int
+    total: int
+    percentage: float
+    date: str
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "quiz_id": self.quiz_id,
+            "paragraph_id": self.paragraph_id,
+            "score": self.score,
+            "total": self.total,
+            "percentage": self.percentage,
+            "date": self.date,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
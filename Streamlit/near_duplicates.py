@@ -0,0 +1,112 @@
+"""Near-duplicate detection for paragraphs (MinHash signatures + LSH).
+
+Each paragraph is reduced to its word shingles (runs of a few words,
+ignoring case, punctuation and whitespace) and summarized by a MinHash
+signature, whose matching positions estimate the Jaccard similarity of
+two shingle sets. Signatures are cut into bands and every band is hashed
+into a bucket table, so a lookup only compares against paragraphs that
+share at least one band instead of scanning all of them.
+
+With 64 hash functions in 16 bands of 4, paragraphs 80% similar become
+candidates with probability ~0.9998, while 50% similar ones are mostly
+filtered out by the signature check that follows.
+"""
+import re
+import threading
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_MIX = np.uint64(1000003)
+_SHIFT = np.uint64(32)
+
+
+def shingles(text, size=3):
+    """64-bit hashes of the text's overlapping word runs (uint64 array)"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    # str hashes are salted per process, which is fine for an in-memory index
+    hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+    size = min(size, len(words))
+    count = len(words) - size + 1
+    combined = hashes[:count].copy()
+    for offset in range(1, size):
+        combined = combined * _MIX + hashes[offset:offset + count]  # Wraps around mod 2**64
+    return combined
+
+
+class NearDuplicateIndex:
+    """Thread-safe MinHash LSH index from item keys to paragraph signatures"""
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Multiply-shift hash functions: odd multipliers, top 32 bits of a * x + b
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        """MinHash signature of text, or None if it has no words"""
+        x = shingles(text, self.shingle_size)
+        if not len(x):
+            return None
+        return ((self._a * x[:, None] + self._b) >> _SHIFT).min(axis=0)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, text):
+        """Index text under key, replacing what was indexed under it before"""
+        signature = self.signature(text)
+        with self._lock:
+            self._remove(key)
+            if signature is None:
+                return
+            self._signatures[key] = signature
+            for buckets, band in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for buckets, band in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band]
+
+    def query(self, text, threshold=0.8, exclude=(), limit=5):
+        """[(estimated similarity, key)] of indexed texts at least threshold similar, best first"""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for buckets, band in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(band, ()))
+            candidates.difference_update(exclude)
+            scored = [
+                (float(np.count_nonzero(self._signatures[key] == signature)) / self.num_perm, key)
+                for key in candidates
+            ]
+        matches = [match for match in scored if match[0] >= threshold]
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
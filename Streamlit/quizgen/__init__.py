@@ -0,0 +1,15 @@
+"""Headless quiz generation.
+
+Everything needed to turn study text into quiz questions, with no
+Streamlit dependency: model providers, the pooled HTTP client, rate
+limiting, chunking, token budgets, streaming and parsing, the quiz cache,
+request metrics and the offline generator. QuizEngine ties them together.
+
+The same engine runs in-process in the Streamlit app or behind the HTTP
+API in quizgen.service (python -m quizgen.service), which the app reaches
+through RemoteEngine when QUIZ_SERVICE_URL is set.
+"""
+from .client import RemoteEngine
+from .engine import QuizEngine
+
+__all__ = ["QuizEngine", "RemoteEngine"]
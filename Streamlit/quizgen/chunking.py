@@ -0,0 +1,119 @@
+"""Split long study material into token-budgeted chunks and merge the
+questions generated for each chunk back into a single quiz.
+"""
+import re
+
+from .token_budget import count_tokens
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Token count used for chunk budgets (at least 1 per piece)"""
+    return max(1, count_tokens(text))
+
+
+def _split_oversized(piece, max_tokens):
+    """Split one paragraph on sentence boundaries, then on words if needed"""
+    parts = []
+    for sentence in _SENTENCE_END.split(piece):
+        if estimate_tokens(sentence) <= max_tokens:
+            parts.append(sentence)
+            continue
+        # Running total instead of re-counting the joined words for every word
+        current = []
+        current_tokens = 0
+        for word in sentence.split():
+            word_tokens = estimate_tokens(" " + word)  # The separator joins the word's first token
+            if current and current_tokens + word_tokens > max_tokens:
+                parts.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            parts.append(" ".join(current))
+    return parts
+
+
+def split_into_chunks(text, max_tokens=600):
+    """Pack paragraphs (or sentences of long paragraphs) into chunks that
+    each stay within max_tokens"""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(_split_oversized(paragraph, max_tokens))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def allocate_questions(chunks, total):
+    """Spread `total` questions over chunks in proportion to their length.
+
+    Uses largest remainders so the counts add up exactly. When there are
+    more chunks than questions, evenly spaced chunks get one question each
+    so the quiz still covers the whole document.
+    """
+    if not chunks or total <= 0:
+        return [0] * len(chunks)
+
+    if len(chunks) >= total:
+        counts = [0] * len(chunks)
+        step = len(chunks) / total
+        for i in range(total):
+            counts[int(i * step)] = 1
+        return counts
+
+    weights = [estimate_tokens(c) for c in chunks]
+    weight_sum = sum(weights)
+    # Every chunk gets one question, the rest is proportional
+    spare = total - len(chunks)
+    shares = [w * spare / weight_sum for w in weights]
+    counts = [1 + int(s) for s in shares]
+    remainders = sorted(range(len(chunks)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in remainders[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def question_fingerprint(question):
+    """Normalized question text used to spot duplicates"""
+    return " ".join(_NON_WORD.sub(" ", question.get("question", "").lower()).split())
+
+
+def merge_questions(question_lists, num_questions):
+    """Interleave per-chunk questions, drop duplicates and trim to size"""
+    merged = []
+    seen = set()
+    longest = max((len(qs) for qs in question_lists), default=0)
+    for round_index in range(longest):
+        for questions in question_lists:
+            if round_index >= len(questions):
+                continue
+            question = questions[round_index]
+            fingerprint = question_fingerprint(question)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            merged.append(question)
+    return merged[:num_questions]
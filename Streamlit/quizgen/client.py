@@ -0,0 +1,108 @@
+"""Client for the quiz service (quizgen.service).
+
+RemoteEngine has the same generate_cached / top_up interface as
+QuizEngine, so the app can hand generation to a separate service without
+changing how it runs jobs: streamed questions, retry messages and
+cancellation are mirrored into the caller's local job.
+"""
+import time
+
+import requests
+
+from .engine import CANCELLED_MESSAGE
+from .jobs import FAILED, FINISHED_STATES, RETRYING, RUNNING
+from .local_generator import generate_local_quiz
+
+
+class RemoteEngine:
+    """QuizEngine stand-in that submits work to a quiz service and polls it"""
+
+    def __init__(self, url, poll_interval=0.5, connect_timeout=5, read_timeout=30, local_fallback=True):
+        self.url = url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.timeout = (connect_timeout, read_timeout)
+        self.local_fallback = local_fallback
+        self.session = requests.Session()
+
+    @property
+    def ready(self):
+        # The service holds the API key; it reports missing keys per job
+        return True
+
+    @property
+    def label(self):
+        return f"quiz service at {self.url}"
+
+    def health(self):
+        """The service's /healthz reply, or None if it can't be reached"""
+        try:
+            response = self.session.get(f"{self.url}/healthz", timeout=self.timeout)
+            return response.json() if response.status_code == 200 else None
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+
+    def generate_cached(self, text, num_questions=5, use_cache=True, job=None):
+        """Same as QuizEngine.generate_cached, run by the service"""
+        request = {"kind": "quiz", "text": text, "num_questions": num_questions, "use_cache": use_cache}
+        try:
+            return self._run(request, job)
+        except requests.exceptions.RequestException as e:
+            error = f"🌐 Quiz service unavailable: {str(e)}"
+        if self.local_fallback and not (job is not None and job.cancelled):
+            quiz, _ = generate_local_quiz(text, num_questions)
+            if quiz:
+                return quiz, error, "local"
+        return None, error, "api"
+
+    def top_up(self, text, num_questions, avoid, job=None):
+        """Same as QuizEngine.top_up, run by the service"""
+        request = {"kind": "top_up", "text": text, "num_questions": num_questions, "avoid": list(avoid)}
+        try:
+            return self._run(request, job)
+        except requests.exceptions.RequestException as e:
+            return None, f"🌐 Quiz service unavailable: {str(e)}", "api"
+
+    def _run(self, request, job):
+        response = self.session.post(f"{self.url}/v1/jobs", json=request, timeout=self.timeout)
+        if response.status_code != 202:
+            return None, f"❌ Quiz service error {response.status_code}: {self._error(response)}", "api"
+        job_url = f"{self.url}/v1/jobs/{response.json()['id']}"
+
+        try:
+            while True:
+                if job is not None and job.cancelled:
+                    return None, CANCELLED_MESSAGE, "api"
+                response = self.session.get(job_url, timeout=self.timeout)
+                if response.status_code != 200:
+                    return None, f"❌ Quiz service error {response.status_code}: {self._error(response)}", "api"
+                remote = response.json()
+                if job is not None:
+                    # Mirror streamed questions and retry notices into the local job
+                    job.partial.extend(remote["partial"][len(job.partial):])
+                    if remote["status"] in (RUNNING, RETRYING):
+                        job.update(remote["status"], remote["message"])
+                if remote["status"] in FINISHED_STATES:
+                    break
+                if job is not None:
+                    if job.cancel_event.wait(self.poll_interval):
+                        return None, CANCELLED_MESSAGE, "api"
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            # Cancels the remote job if it is still running, forgets it otherwise
+            try:
+                self.session.delete(job_url, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                pass
+
+        result = remote["result"]
+        if remote["status"] == FAILED or result is None:
+            return None, f"❌ Quiz generation failed: {remote['error'] or remote['status']}", "api"
+        return result["questions"], result["error"], result["source"]
+
+    @staticmethod
+    def _error(response):
+        try:
+            return response.json().get("error", response.text)
+        except ValueError:
+            return response.text
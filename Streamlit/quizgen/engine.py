@@ -0,0 +1,545 @@
+"""Quiz generation engine, independent of any UI.
+
+QuizEngine turns study text into multiple-choice questions: it builds the
+prompt within the token budget, splits long documents into chunks, calls
+the model provider through the shared rate limiter with retries and
+backoff, validates and salvages the reply, and serves repeated requests
+from the quiz cache. The Streamlit app, the quiz service and scripts all
+use it the same way:
+
+    engine = QuizEngine(create_provider("fake"), RateLimiter(600))
+    questions, error, source = engine.generate_cached(text, 10)
+
+Long-running calls take an optional jobs.Job to report progress, stream
+questions into job.partial and stop early when the job is cancelled.
+"""
+import math
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from .chunking import allocate_questions, merge_questions, split_into_chunks
+from .jobs import RETRYING, RUNNING, backoff_delay, wait
+from .local_generator import generate_local_quiz
+from .metrics import PARSE_FAILED, PARSE_OK, PARSE_PARTIAL, RequestMetrics
+from .quiz_cache import make_cache_key
+from .question_dedup import unique_questions
+from .quiz_parsing import QuizParseError, parse_quiz_response, validate_question
+from .rate_limiter import RateLimitTimeout
+from .single_flight import FlightCancelled, SingleFlight
+from .streaming import QuizStreamParser, iter_stream_content
+from .token_budget import completion_budget, count_tokens, trim_to_tokens
+
+DEFAULT_SETTINGS = {
+    # Request
+    "temperature": 0.5,
+    "json_mode": True,             # Ask for a JSON object reply when the provider supports it
+    "stream": True,                # Stream completions so questions show up as they are written
+    "prompt_version": 2,           # Bump whenever the prompt changes so old cached quizzes are not reused
+    # Retries
+    "max_retries": 3,
+    "backoff_base": 2,             # First retry waits up to this many seconds, doubling each time
+    "backoff_max": 60,
+    "max_queue_wait": 180,         # Give up if a rate-limit slot is this many seconds later than the
+                                   # requests queued ahead of this one take at the configured rate
+    # Long documents
+    "chunk_tokens": 600,           # Text budget per API request
+    "chunk_workers": 4,            # Chunks generated in parallel
+    "overgenerate_ratio": 0.2,     # Extra questions to survive de-duplication
+    # Repeats
+    "duplicate_threshold": 0.7,    # Questions this similar to one already asked are dropped (0 = off)
+    # Token budget
+    "context_window": 16384,       # Prompt + reply limit of the model
+    "tokens_per_question": 120,    # One question with options and explanation, as JSON
+    "reply_overhead": 20,          # The {"quiz": [...]} wrapper
+    "safety_margin": 1.25,
+    "min_completion_tokens": 256,
+    "max_completion_tokens": 4096,
+    # Offline fallback
+    "local_fallback": True,        # Build questions offline when the API is throttled, unbilled or down
+    "local_first_max_chars": 0,    # Skip the API entirely for texts up to this length (0 = never)
+}
+
+# Settings a deployment sets through the environment, for the app and the service alike
+ENV_SETTINGS = {
+    "QUIZ_CONTEXT_WINDOW": ("context_window", int),
+}
+
+
+def settings_from_env(environ=None):
+    """Engine settings overridden by environment variables"""
+    environ = os.environ if environ is None else environ
+    return {name: convert(environ[variable]) for variable, (name, convert) in ENV_SETTINGS.items()
+            if environ.get(variable)}
+
+
+CANCELLED_MESSAGE = "Generation cancelled."
+
+SYSTEM_PROMPT = "You are a helpful quiz generator that returns only valid JSON responses."
+
+RATE_LIMITED_MESSAGE = """⏳ **OpenAI Rate Limit Exceeded**
+
+Your OpenAI API is being throttled. This means:
+
+1. **No Credits/Billing**: You need to add payment method
+2. **Free Tier Exhausted**: Daily/monthly quota used up
+3. **Too Many Requests**: Hitting OpenAI's rate limits
+
+**Solutions:**
+✅ Add credits: https://platform.openai.com/account/billing/overview
+✅ Check usage: https://platform.openai.com/usage
+✅ Wait a few minutes and try again
+✅ Reduce questions to 3-5 per quiz
+
+**Make sure:**
+- Your API key is valid
+- Billing is set up
+- You have available credits
+"""
+
+INVALID_KEY_MESSAGE = """❌ **Invalid API Key**
+
+Your API key is not working. Please check:
+
+1. Copy your key again from: https://platform.openai.com/api-keys
+2. Make sure it starts with 'sk-proj-' or 'sk-'
+3. Update your `.streamlit/secrets.toml` file:
+   ```
+   OPENAI_API_KEY = "sk-proj-your-actual-key"
+   ```
+4. Restart the Streamlit app
+"""
+
+NO_BILLING_MESSAGE = """❌ **Access Denied - No Billing Setup**
+
+Your API key exists but has no access. This means:
+
+**You MUST set up billing first:**
+1. Go to: https://platform.openai.com/account/billing/overview
+2. Click "Add payment method"
+3. Add a credit/debit card
+4. Add at least $5 in credits
+5. Wait 5-10 minutes for activation
+
+**Note:** Even with a valid API key, you CANNOT use the API without adding a payment method and credits.
+
+Check your account status: https://platform.openai.com/account/billing/overview
+"""
+
+API_ERROR_MESSAGE = """❌ **OpenAI API Error {status}**
+
+{message}
+
+**Common Issues:**
+- 401: Invalid API key
+- 403: No billing/credits set up
+- 429: Rate limit or quota exceeded
+- 500: OpenAI server error (try again)
+
+**Check:**
+1. API Key: https://platform.openai.com/api-keys
+2. Billing: https://platform.openai.com/account/billing/overview
+3. Usage: https://platform.openai.com/usage
+
+**Full error:** {data}
+"""
+
+
+def shuffle_options(q):
+    correct = q["answer"]
+    random.shuffle(q["options"])
+    q["answer"] = correct
+
+
+class QuizEngine:
+    """Generates quizzes through a provider; safe to share between threads"""
+
+    def __init__(self, provider, rate_limiter, cache=None, metrics=None, single_flight=None, **settings):
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown engine settings: {', '.join(sorted(unknown))}")
+        self.provider = provider
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+
+    @property
+    def ready(self):
+        return self.provider.ready
+
+    @property
+    def label(self):
+        return self.provider.label
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def generate_cached(self, text, num_questions=5, use_cache=True, job=None):
+        """Serve a quiz from the shared cache, calling the API only on a miss.
+
+        Returns (quiz, error, source) with source "cache", "api", "shared"
+        (an identical request was already running) or "local". When the API
+        fails, the offline generator steps in and error explains why. With
+        use_cache=False the cache is bypassed (used by Regenerate) but the
+        fresh quiz still replaces the entry.
+        """
+        settings = self.settings
+        if len(text) <= settings["local_first_max_chars"]:
+            quiz, error = generate_local_quiz(text, num_questions)
+            if quiz:
+                return quiz, None, "local"
+
+        key = self.cache_key(text, num_questions)
+        if use_cache and self.cache is not None:
+            quiz = self.cache.get(key)
+            if quiz:
+                return quiz, None, "cache"
+
+        quiz, error, shared = self._generate_single_flight(key, text, num_questions, job=job)
+        if quiz:
+            if shared:
+                return quiz, None, "shared"
+            if self.cache is not None:
+                self.cache.put(key, quiz)
+            return quiz, None, "api"
+
+        if settings["local_fallback"] and not (job is not None and job.cancelled):
+            # Offline questions are not cached so the next attempt tries the API again
+            local_quiz, _ = generate_local_quiz(text, num_questions)
+            if local_quiz:
+                return local_quiz, error, "local"
+        return None, error, "api"
+
+    def top_up(self, text, num_questions, avoid, job=None):
+        """More questions for an existing set, none of them repeating avoid.
+
+        Uncached and without the offline fallback: the caller already has
+        questions, and local ones would mostly be duplicates.
+        """
+        quiz, error = self.generate(text, num_questions, job=job, avoid=avoid)
+        return quiz, error, "api"
+
+    def generate(self, text, num_questions=5, job=None, avoid=()):
+        """Generate a quiz, splitting long documents into chunks generated in parallel.
+
+        Questions listed in avoid (question dicts or texts) are not asked for again.
+        Returns (quiz, error).
+        """
+        if not text or not text.strip():
+            return None, "Please provide text to generate questions from."
+
+        settings = self.settings
+        chunks = split_into_chunks(text, settings["chunk_tokens"])
+        if len(chunks) <= 1:
+            # Only single requests report questions early: merged chunk results
+            # are re-ordered and trimmed, so early answers could not be kept
+            on_question = job.partial.append if job is not None else None
+            return self.generate_chunk(text, num_questions, job=job, on_question=on_question, avoid=avoid)
+
+        extra = math.ceil(num_questions * settings["overgenerate_ratio"])
+        counts = allocate_questions(chunks, num_questions + extra)
+        work = [(chunk, count) for chunk, count in zip(chunks, counts) if count > 0]
+
+        results = [None] * len(work)
+        errors = []
+        with ThreadPoolExecutor(max_workers=settings["chunk_workers"]) as executor:
+            futures = {
+                executor.submit(self.generate_chunk, chunk, count, job=job, avoid=avoid): i
+                for i, (chunk, count) in enumerate(work)
+            }
+            for future in as_completed(futures):
+                quiz, error = future.result()
+                if error:
+                    errors.append(error)
+                else:
+                    results[futures[future]] = quiz
+
+        question_lists = [quiz for quiz in results if quiz]
+        if not question_lists:
+            return None, errors[0] if errors else "No questions generated. Try with more detailed text."
+
+        merged = merge_questions(question_lists, sum(len(quiz) for quiz in question_lists))
+        questions = unique_questions(merged, avoid, threshold=settings["duplicate_threshold"])[:num_questions]
+        shortfall = num_questions - len(questions)
+        if shortfall > 0 and not (job is not None and job.cancelled):
+            # Chunks repeated each other: ask only for the missing questions
+            extra, _ = self.generate_chunk(text, shortfall, job=job, avoid=list(avoid) + questions)
+            questions.extend(extra or [])
+        return questions, None
+
+    def cache_key(self, text, num_questions):
+        settings = self.settings
+        return make_cache_key(
+            text, num_questions, f"{self.provider.name}:{self.provider.model}",
+            settings["temperature"], settings["prompt_version"]
+        )
+
+    # -------------------------
+    # Requests
+    # -------------------------
+    def max_tokens_for(self, num_questions):
+        settings = self.settings
+        return completion_budget(
+            num_questions,
+            tokens_per_question=settings["tokens_per_question"],
+            overhead=settings["reply_overhead"],
+            margin=settings["safety_margin"],
+            minimum=settings["min_completion_tokens"],
+            maximum=settings["max_completion_tokens"],
+        )
+
+    def build_request(self, text, num_questions, avoid=()):
+        """Chat-completions payload asking for num_questions questions"""
+        prompt = f"""Create exactly {num_questions} multiple-choice questions from the following text.
+
+IMPORTANT: Return ONLY valid JSON in this EXACT format with no additional text:
+
+{{
+  "quiz": [
+    {{
+      "question": "What is the main topic?",
+      "options": ["a) Option 1", "b) Option 2", "c) Option 3", "d) Option 4"],
+      "answer": "b) Option 2",
+      "explanation": "Brief explanation here"
+    }}
+  ]
+}}
+
+Rules:
+- Create clear questions based ONLY on the text below
+- Each question must have exactly 4 options (a, b, c, d)
+- Only ONE correct answer per question
+- Include brief explanations
+- Return ONLY the JSON, no markdown, no extra text
+"""
+        if avoid:
+            prompt += "- Do NOT repeat these questions, they are already in the quiz:\n"
+            prompt += "".join(f"  - {q if isinstance(q, str) else q['question']}\n" for q in avoid)
+        prompt += """
+Text to analyze:
+"""
+        settings = self.settings
+        provider = self.provider
+
+        # Whatever the reply and the instructions leave of the context window goes to the text
+        max_tokens = self.max_tokens_for(num_questions)
+        framing = 16  # Role markers and separators of the two chat messages
+        text_budget = (settings["context_window"] - max_tokens - count_tokens(SYSTEM_PROMPT)
+                       - count_tokens(prompt) - framing)
+        prompt += trim_to_tokens(text, text_budget)
+
+        data = {
+            "model": provider.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": settings["temperature"],
+            "max_tokens": max_tokens,
+        }
+        if settings["json_mode"] and provider.json_mode:
+            data["response_format"] = {"type": "json_object"}
+        if settings["stream"]:
+            data["stream"] = True
+            if provider.stream_usage:
+                data["stream_options"] = {"include_usage": True}
+        return data
+
+    def _wait_before_retry(self, attempt, reason, retry_after=None, job=None):
+        """Back off before the next attempt; returns False if the job was cancelled"""
+        settings = self.settings
+        delay = backoff_delay(attempt, base=settings["backoff_base"], cap=settings["backoff_max"],
+                              retry_after=retry_after)
+        if job is not None:
+            job.update(RETRYING, f"{reason} Retrying in {delay:.0f}s (attempt {attempt + 2}/{settings['max_retries']})")
+        if not wait(delay, job):
+            return False
+        if job is not None:
+            job.update(RUNNING, "")
+        return True
+
+    def generate_chunk(self, text, num_questions=5, job=None, on_question=None, avoid=()):
+        """Generate quiz questions for one chunk, with rate limiting and retries.
+
+        Invalid questions are dropped and only the missing number is asked for
+        again (within max_retries). When streaming is enabled, on_question is
+        called with each question as soon as it has been fully received.
+        """
+        if not text or not text.strip():
+            return None, "Please provide text to generate questions from."
+
+        provider = self.provider
+        if not provider.ready:
+            return None, "API key is required."
+
+        settings = self.settings
+        max_retries = settings["max_retries"]
+        stream = settings["stream"]
+        threshold = settings["duplicate_threshold"]
+        limiter = self.rate_limiter
+        metrics = self.metrics
+        questions = []
+        last_error = "Failed after multiple retries."
+
+        for attempt in range(max_retries):
+            if job is not None:
+                if job.cancelled:
+                    return None, CANCELLED_MESSAGE
+                job.attempts += 1
+
+            try:
+                # A long queue (several sessions, chunked documents) is expected to take
+                # longer, so the limit only covers delays beyond what the rate allows
+                queue_wait = limiter.acquire(timeout=settings["max_queue_wait"] + limiter.queue_time())
+            except RateLimitTimeout:
+                return None, "⏳ Too many quiz requests are queued right now. Please try again in a minute."
+
+            needed = num_questions - len(questions)
+            # Everything a new question must not repeat; with answers, repeats are told apart better
+            asked = list(avoid) + questions
+            data = self.build_request(text, needed, avoid=asked)
+            sample = metrics.start(provider.name, provider.model, attempt, queue_wait)
+
+            try:
+                response = provider.send(data, stream=stream)
+                sample.on_response(response)
+
+                if response.status_code == 429:
+                    try:
+                        retry_after = int(response.headers.get('Retry-After'))
+                    except (TypeError, ValueError):
+                        retry_after = None
+
+                    if attempt < max_retries - 1:
+                        response.close()
+                        metrics.finish(sample)  # Before the backoff wait
+                        # Pause the shared limiter so other sessions back off too
+                        if retry_after:
+                            limiter.defer(retry_after)
+                        if not self._wait_before_retry(attempt, "⏳ Rate limit hit from OpenAI.", retry_after, job):
+                            return None, CANCELLED_MESSAGE
+                        continue
+                    return None, RATE_LIMITED_MESSAGE
+
+                if response.status_code == 401:
+                    return None, INVALID_KEY_MESSAGE
+
+                if response.status_code == 403:
+                    return None, NO_BILLING_MESSAGE
+
+                if response.status_code in (500, 502, 503, 504) and attempt < max_retries - 1:
+                    response.close()
+                    metrics.finish(sample)
+                    if not self._wait_before_retry(attempt, f"⚠️ OpenAI server error {response.status_code}.", job=job):
+                        return None, CANCELLED_MESSAGE
+                    continue
+
+                if response.status_code != 200:
+                    error_data = response.json() if response.text else {}
+                    error_message = error_data.get('error', {}).get('message', 'Unknown error')
+                    return None, API_ERROR_MESSAGE.format(status=response.status_code, message=error_message,
+                                                          data=error_data)
+
+                streamed = []
+                if stream:
+                    parser = QuizStreamParser()
+                    parts = []
+                    usage = {}
+                    with response:
+                        for delta in iter_stream_content(response, usage):
+                            if job is not None and job.cancelled:
+                                return None, CANCELLED_MESSAGE
+                            parts.append(delta)
+                            for q in parser.feed(delta):
+                                q = validate_question(q)
+                                if (q is not None and len(streamed) < needed
+                                        and unique_questions([q], asked + streamed, threshold)):
+                                    shuffle_options(q)
+                                    streamed.append(q)
+                                    if on_question:
+                                        on_question(q)
+                    generated_text = "".join(parts)
+                    sample.on_usage(usage)
+                else:
+                    result = response.json()
+                    generated_text = result['choices'][0]['message']['content']
+                    sample.on_usage(result.get("usage"))
+
+                try:
+                    parsed, rejected = parse_quiz_response(generated_text)
+                except QuizParseError:
+                    parsed, rejected = [], 0
+                valid = len(parsed)
+                parsed = unique_questions(parsed, asked, threshold)
+                repeated = valid - len(parsed)
+
+                # Keep the already shown questions (and their option order)
+                if len(streamed) >= len(parsed):
+                    batch = streamed
+                else:
+                    for q in parsed:
+                        shuffle_options(q)
+                    batch = parsed
+                questions.extend(batch[:needed])
+                sample.questions = min(len(batch), needed)
+                sample.rejected = rejected
+                sample.parse = PARSE_OK if len(batch) >= needed else PARSE_PARTIAL if batch else PARSE_FAILED
+
+                if len(questions) >= num_questions:
+                    return questions, None
+
+                # Salvage what was valid and ask only for the rest
+                last_error = "No valid questions generated. Try with more detailed text."
+                if job is not None:
+                    job.update(RETRYING, f"🧩 {len(questions)}/{num_questions} questions usable "
+                                         f"({rejected} rejected, {repeated} repeated) - asking for the rest...")
+                continue
+
+            except requests.exceptions.Timeout:
+                sample.error = "timeout"
+                metrics.finish(sample)
+                if attempt < max_retries - 1:
+                    if not self._wait_before_retry(attempt, "⏱️ Request timed out.", job=job):
+                        return None, CANCELLED_MESSAGE
+                    continue
+                last_error = "⏱️ Request timed out."
+                break
+            except requests.exceptions.RequestException as e:
+                sample.error = "network"
+                last_error = f"🌐 Network error: {str(e)}"
+                break
+            except Exception as e:
+                sample.error = "exception"
+                last_error = f"❌ Unexpected error: {str(e)}"
+                break
+            finally:
+                metrics.finish(sample)
+
+        if questions:
+            # A shorter quiz beats throwing away the questions that were valid
+            return questions, None
+        return None, last_error
+
+    def _generate_single_flight(self, key, text, num_questions=5, job=None):
+        """generate(), joined by every caller asking for the same key meanwhile.
+
+        Returns (quiz, error, shared); shared is True when another caller's
+        request produced the quiz.
+        """
+        def run():
+            quiz, error = self.generate(text, num_questions, job=job)
+            return quiz, error, job is not None and job.cancelled
+
+        cancel_event = job.cancel_event if job is not None else None
+        while True:
+            try:
+                (quiz, error, leader_cancelled), shared = self.single_flight.do(key, run, cancel_event)
+            except FlightCancelled:
+                return None, CANCELLED_MESSAGE, False
+            # The caller doing the work cancelled it; go again, likely as the leader
+            if not (shared and leader_cancelled):
+                return quiz, error, shared
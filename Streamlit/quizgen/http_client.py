@@ -0,0 +1,162 @@
+"""Process-wide pooled HTTP client for the model API.
+
+A single requests.Session with a sized connection pool is shared by every
+generation path, so TCP + TLS handshakes are paid once per pooled socket
+instead of once per quiz. The client also keeps simple health numbers
+(latency, failures, how many new connections had to be opened).
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class ClientHealth:
+    """Thread-safe running health numbers for the pooled client"""
+
+    def __init__(self, unhealthy_after=3):
+        self.unhealthy_after = unhealthy_after
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.new_connections = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_status = None
+        self.last_error = None
+        self.last_success_at = None
+
+    def record_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def record_response(self, status_code, latency):
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            self.last_status = status_code
+            if status_code >= 500:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = f"HTTP {status_code}"
+            else:
+                self.successes += 1
+                self.consecutive_failures = 0
+                self.last_success_at = time.time()
+
+    def record_error(self, error, latency):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            self.last_status = None
+            self.last_error = str(error)
+
+    @property
+    def healthy(self):
+        return self.consecutive_failures < self.unhealthy_after
+
+    def snapshot(self):
+        """Plain dict copy for display"""
+        with self._lock:
+            return {
+                "healthy": self.healthy,
+                "requests": self.requests,
+                "successes": self.successes,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "new_connections": self.new_connections,
+                "avg_latency": self.total_latency / self.requests if self.requests else 0.0,
+                "last_latency": self.last_latency,
+                "last_status": self.last_status,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+            }
+
+
+# Seconds spent opening sockets (TCP + TLS) during the current thread's request
+_connect_timing = threading.local()
+
+
+def _counting_pool(base_cls, health):
+    """Connection pool subclass that reports and times every newly opened socket"""
+
+    class CountingPool(base_cls):
+        def _new_conn(self):
+            health.record_connection()
+            conn = super()._new_conn()
+            connect = conn.connect
+
+            def timed_connect():
+                start = time.perf_counter()
+                try:
+                    connect()
+                finally:
+                    _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - start
+
+            conn.connect = timed_connect
+            return conn
+
+    return CountingPool
+
+
+class _PooledAdapter(HTTPAdapter):
+    def __init__(self, health, **kwargs):
+        self._health = health
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._health),
+            "https": _counting_pool(HTTPSConnectionPool, self._health),
+        }
+
+
+class PooledClient:
+    """Keep-alive session with connect/read timeouts and health tracking"""
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30, unhealthy_after=3):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.health = ClientHealth(unhealthy_after=unhealthy_after)
+
+        # Retries are handled by the caller (rate limits need custom waits)
+        adapter = _PooledAdapter(
+            self.health,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, **kwargs):
+        """POST through the shared pool; raises requests exceptions like requests.post.
+
+        The response gets a connect_time attribute: seconds spent opening a
+        new socket for it (0.0 when a pooled connection was reused).
+        response.elapsed is the time until the response headers arrived.
+        """
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.health.record_error(e, time.perf_counter() - start)
+            raise
+        self.health.record_response(response.status_code, time.perf_counter() - start)
+        response.connect_time = _connect_timing.seconds
+        return response
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,144 @@
+"""Background job system for quiz generation.
+
+Generation runs on a process-wide worker pool, so a Streamlit script run
+never blocks on the API or on retry waits. Pages keep the job id and poll
+its status on later reruns. Retries use exponential backoff with full
+jitter, honor Retry-After, and can be cancelled.
+"""
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+def backoff_delay(attempt, base=2.0, cap=60.0, retry_after=None):
+    """Delay before retry number `attempt` (0-based).
+
+    Full jitter: uniform in [0, min(cap, base * 2**attempt)]. A server
+    Retry-After is a lower bound, since retrying earlier only earns
+    another 429.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def wait(delay, job=None):
+    """Sleep for delay seconds; returns False if the job got cancelled"""
+    if job is None:
+        time.sleep(delay)
+        return True
+    return not job.cancel_event.wait(delay)
+
+
+class Job:
+    """One unit of background work and its outcome"""
+
+    def __init__(self, label=""):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.status = QUEUED
+        self.message = ""
+        self.result = None
+        self.partial = []  # Results produced so far, e.g. streamed questions
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def update(self, status=None, message=None):
+        """Called by the running work to report progress"""
+        if status is not None:
+            self.status = status
+        if message is not None:
+            self.message = message
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and remembers them for polling"""
+
+    def __init__(self, max_workers=4, keep_finished_seconds=600):
+        self.keep_finished_seconds = keep_finished_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quiz-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, label="", **kwargs):
+        """Run fn(*args, job=job, **kwargs) in the background; returns the job id"""
+        job = Job(label=label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.finished_at = time.time()
+            job.update(CANCELLED)
+            return
+        job.started_at = time.time()
+        job.update(RUNNING)
+        try:
+            job.result = fn(*args, job=job, **kwargs)
+            status = CANCELLED if job.cancelled else DONE
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+        job.finished_at = time.time()
+        job.update(status, message="")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Stop a job; queued jobs never start, running ones stop at their next wait"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.finished_at = time.time()
+            job.update(CANCELLED)
+        return True
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _prune(self):
+        # Sessions that went away never collect their results
+        cutoff = time.time() - self.keep_finished_seconds
+        stale = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in stale:
+            del self._jobs[job_id]
@@ -0,0 +1,150 @@
+"""Offline question generator used when the model API is unavailable.
+
+Builds two kinds of multiple-choice questions straight from the text, in
+the same {"question", "options", "answer", "explanation"} shape the API
+returns:
+
+- term/definition: sentences like "Mitochondria are the ..." become
+  "Which term matches this description?"
+- cloze: a keyword in a sentence is blanked out and the other keywords of
+  the text serve as distractors.
+
+Pure Python and deterministic: the same text always gives the same quiz.
+"""
+import hashlib
+import random
+import re
+from collections import Counter
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD = re.compile(r"[A-Za-z][A-Za-z-]*[A-Za-z]|\d+(?:\.\d+)?")
+_DEFINITION = re.compile(
+    r"^(?:(?:The|A|An)\s+)?(?P<term>[A-Za-z][\w\s-]{1,40}?)\s+"
+    r"(?:is|are|was|were|refers to|means|describes)\s+(?P<definition>.{12,})$"
+)
+
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers him his how however i if in into is it its itself just more most much must
+my no nor not now of off on once only or other our ours out over own same she should so some such
+than that the their theirs them then there these they this those through to too under until up upon
+very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+MIN_SENTENCE_WORDS = 6
+
+
+def split_sentences(text):
+    sentences = []
+    for sentence in _SENTENCE.split(" ".join(text.split())):
+        sentence = sentence.strip()
+        if len(sentence.split()) >= MIN_SENTENCE_WORDS:
+            sentences.append(sentence)
+    return sentences
+
+
+def extract_keywords(text, limit=40):
+    """Content words ranked by frequency; capitalized terms and numbers get a boost"""
+    scores = Counter()
+    spelling = {}
+    for word in _WORD.findall(text):
+        key = word.lower()
+        if key in STOPWORDS or (len(key) < 4 and not key[0].isdigit()):
+            continue
+        scores[key] += 1.5 if word[0].isupper() or word[0].isdigit() else 1.0
+        spelling.setdefault(key, word)
+    ranked = sorted(scores, key=lambda key: (-scores[key], key))
+    return [spelling[key] for key in ranked[:limit]]
+
+
+def _options(answer, candidates, rng):
+    """answer plus three distinct distractors, shuffled and lettered"""
+    seen = {answer.lower()}
+    distractors = []
+    for candidate in candidates:
+        if candidate.lower() not in seen:
+            seen.add(candidate.lower())
+            distractors.append(candidate)
+    if len(distractors) < 3:
+        return None
+    options = [answer] + rng.sample(distractors, 3)
+    rng.shuffle(options)
+    lettered = [f"{letter}) {option}" for letter, option in zip("abcd", options)]
+    return lettered, lettered[options.index(answer)]
+
+
+def _shorten(text, limit=160):
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def definition_questions(sentences, rng):
+    definitions = []
+    for sentence in sentences:
+        match = _DEFINITION.match(sentence.rstrip("."))
+        if match and match.group("term").lower() not in STOPWORDS:
+            definitions.append((match.group("term").strip(), match.group("definition").strip(), sentence))
+
+    questions = []
+    terms = [term for term, _, _ in definitions]
+    for term, definition, sentence in definitions:
+        picked = _options(term, terms, rng)
+        if picked is None:
+            break
+        options, answer = picked
+        questions.append({
+            "question": f"Which term matches this description: \"{_shorten(definition)}\"?",
+            "options": options,
+            "answer": answer,
+            "explanation": sentence,
+        })
+    return questions
+
+
+def cloze_questions(sentences, keywords, rng):
+    ranked = {word.lower(): i for i, word in enumerate(keywords)}
+    questions = []
+    used = set()
+    for sentence in sentences:
+        words = [word for word in _WORD.findall(sentence) if word.lower() in ranked and word.lower() not in used]
+        if not words:
+            continue
+        answer = min(words, key=lambda word: ranked[word.lower()])
+        # Words from the same sentence would give the blank away
+        in_sentence = {word.lower() for word in _WORD.findall(sentence)} - {answer.lower()}
+        picked = _options(answer, [word for word in keywords if word.lower() not in in_sentence], rng)
+        if picked is None:
+            continue
+        used.add(answer.lower())
+        options, correct = picked
+        blanked = re.sub(rf"\b{re.escape(answer)}\b", "_____", sentence, count=1)
+        questions.append({
+            "question": f"Fill in the blank: {_shorten(blanked, 240)}",
+            "options": options,
+            "answer": correct,
+            "explanation": sentence,
+        })
+    return questions
+
+
+def generate_local_quiz(text, num_questions=5):
+    """Build up to num_questions questions from text; returns (quiz, error)"""
+    if not text or not text.strip():
+        return None, "Please provide text to generate questions from."
+
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    sentences = split_sentences(text)
+    keywords = extract_keywords(text)
+
+    questions = definition_questions(sentences, rng)
+    rng.shuffle(questions)
+    questions = questions[:max(1, num_questions // 2)]
+    if len(questions) < num_questions:
+        explained = {q["explanation"] for q in questions}
+        remaining = [sentence for sentence in sentences if sentence not in explained]
+        questions += cloze_questions(remaining, keywords, rng)[:num_questions - len(questions)]
+
+    if not questions:
+        return None, "Not enough material to build questions offline. Try a longer text."
+    return questions, None
@@ -0,0 +1,204 @@
+"""Per-request instrumentation for model API calls.
+
+Every HTTP request made for a quiz becomes a RequestSample: how long it
+waited for a rate-limit slot, connect time, time to first byte, total
+time, attempt number, HTTP status, token usage and how parsing went.
+RequestMetrics aggregates samples into histograms and counters, keeps the
+most recent ones for the admin page, can append each sample to a JSONL
+log and renders everything in the Prometheus text format.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TIMINGS = ("queue_wait", "connect", "ttfb", "total")
+
+PARSE_OK = "ok"            # Got every question asked for
+PARSE_PARTIAL = "partial"  # Some questions were usable
+PARSE_FAILED = "failed"    # Nothing usable in the reply
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self):
+        """[(upper bound, count of values <= bound)], ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestSample:
+    """Timings and outcome of one HTTP request to the model API"""
+
+    __slots__ = (
+        "timestamp", "provider", "model", "attempt", "queue_wait", "connect", "ttfb", "total",
+        "status", "error", "prompt_tokens", "completion_tokens", "parse", "questions", "rejected", "_start",
+    )
+
+    def __init__(self, provider, model, attempt, queue_wait):
+        self.timestamp = time.time()
+        self.provider = provider
+        self.model = model
+        self.attempt = attempt
+        self.queue_wait = queue_wait
+        self.connect = None
+        self.ttfb = None
+        self.total = None
+        self.status = None
+        self.error = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.parse = None
+        self.questions = 0
+        self.rejected = 0
+        self._start = time.perf_counter()
+
+    def on_response(self, response):
+        """Take status, connect time and time to first byte from a response"""
+        self.status = response.status_code
+        self.connect = getattr(response, "connect_time", None)
+        elapsed = getattr(response, "elapsed", None)
+        if elapsed is not None:
+            self.ttfb = elapsed.total_seconds()
+
+    def on_usage(self, usage):
+        if usage:
+            self.prompt_tokens = usage.get("prompt_tokens")
+            self.completion_tokens = usage.get("completion_tokens")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if not name.startswith("_")}
+
+
+class RequestMetrics:
+    """Thread-safe aggregation of RequestSamples"""
+
+    def __init__(self, jsonl_path=None, keep_recent=200):
+        self.jsonl_path = jsonl_path
+        if jsonl_path:
+            directory = os.path.dirname(jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.histograms = {name: Histogram() for name in TIMINGS}
+        self.statuses = Counter()
+        self.parse_outcomes = Counter()
+        self.tokens = Counter()
+        self.retries = 0
+        self.recent = deque(maxlen=keep_recent)
+
+    def start(self, provider, model, attempt, queue_wait):
+        return RequestSample(provider, model, attempt, queue_wait)
+
+    def finish(self, sample):
+        """Record a sample; later calls for the same sample are ignored"""
+        if sample.total is not None:
+            return
+        sample.total = time.perf_counter() - sample._start
+        with self._lock:
+            for name in TIMINGS:
+                value = getattr(sample, name)
+                if value is not None:
+                    self.histograms[name].observe(value)
+            self.statuses[str(sample.status) if sample.status is not None else sample.error or "error"] += 1
+            if sample.parse:
+                self.parse_outcomes[sample.parse] += 1
+            self.tokens["prompt"] += sample.prompt_tokens or 0
+            self.tokens["completion"] += sample.completion_tokens or 0
+            if sample.attempt > 0:
+                self.retries += 1
+            self.recent.append(sample)
+
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(sample.to_dict()) + "\n")
+
+    def snapshot(self):
+        """Copies of the aggregates for display"""
+        with self._lock:
+            return {
+                "requests": sum(self.statuses.values()),
+                "retries": self.retries,
+                "statuses": dict(self.statuses),
+                "parse_outcomes": dict(self.parse_outcomes),
+                "tokens": dict(self.tokens),
+                "histograms": {name: hist.cumulative() for name, hist in self.histograms.items()},
+                "averages": {
+                    name: hist.sum / hist.count if hist.count else 0.0
+                    for name, hist in self.histograms.items()
+                },
+                "recent": [sample.to_dict() for sample in self.recent],
+            }
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append("# TYPE quiz_api_requests_total counter")
+            for status, count in sorted(self.statuses.items()):
+                lines.append(f'quiz_api_requests_total{{status="{status}"}} {count}')
+            lines.append("# TYPE quiz_api_retries_total counter")
+            lines.append(f"quiz_api_retries_total {self.retries}")
+            lines.append("# TYPE quiz_api_parse_total counter")
+            for outcome, count in sorted(self.parse_outcomes.items()):
+                lines.append(f'quiz_api_parse_total{{outcome="{outcome}"}} {count}')
+            lines.append("# TYPE quiz_api_tokens_total counter")
+            for kind, count in sorted(self.tokens.items()):
+                lines.append(f'quiz_api_tokens_total{{kind="{kind}"}} {count}')
+            for name, hist in self.histograms.items():
+                metric = f"quiz_api_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for bound, count in hist.cumulative():
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{metric}_bucket{{le="{le}"}} {count}')
+                lines.append(f"{metric}_sum {hist.sum:.6f}")
+                lines.append(f"{metric}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(metrics, port, host="127.0.0.1"):
+    """Serve metrics.prometheus_text() at http://host:port/metrics in a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+    return httpd
@@ -0,0 +1,225 @@
+"""Model backends that quiz generation can talk to.
+
+Every provider takes a chat-completions payload and returns a response
+object with the requests.Response surface the generator uses
+(status_code, headers, text, json(), iter_lines(), close()):
+
+- OpenAIProvider: the hosted OpenAI API.
+- OpenAICompatibleProvider: any server speaking the same protocol
+  (llama.cpp, vLLM, Ollama, LM Studio, ...), usually on localhost.
+- FakeProvider: deterministic built-in backend with no network, for
+  load tests, benchmarks and offline development.
+"""
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import timedelta
+
+
+class Provider:
+    """Interface for model backends"""
+
+    name = "provider"
+    json_mode = False     # Supports response_format={"type": "json_object"}
+    stream_usage = False  # Reports token usage on streams (stream_options.include_usage)
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def ready(self):
+        """False when the backend is missing configuration (e.g. an API key)"""
+        return True
+
+    @property
+    def label(self):
+        return f"{self.name} · {self.model}"
+
+    def send(self, payload, stream=False):
+        raise NotImplementedError
+
+
+class OpenAICompatibleProvider(Provider):
+    """Chat-completions endpoint at base_url, e.g. http://localhost:8000/v1"""
+
+    name = "openai-compatible"
+
+    def __init__(self, client, base_url, model, api_key=None, json_mode=False):
+        super().__init__(model)
+        self.client = client
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.json_mode = json_mode
+
+    def headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def send(self, payload, stream=False):
+        payload = dict(payload, model=self.model)
+        return self.client.post(self.url, headers=self.headers(), json=payload, stream=stream)
+
+
+class OpenAIProvider(OpenAICompatibleProvider):
+    """The hosted OpenAI API"""
+
+    name = "openai"
+    stream_usage = True
+
+    def __init__(self, client, api_key, model="gpt-4o-mini", base_url="https://api.openai.com/v1"):
+        super().__init__(client, base_url, model, api_key=api_key, json_mode=True)
+
+    @property
+    def ready(self):
+        return bool(self.api_key)
+
+    @property
+    def label(self):
+        return f"OpenAI {self.model}"
+
+
+class FakeResponse:
+    """Just enough of requests.Response for a canned completion"""
+
+    def __init__(self, content, stream=False, chunk_size=40, chunk_delay=0.0, status_code=200, headers=None,
+                 elapsed=0.0, prompt_tokens=0):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.elapsed = timedelta(seconds=elapsed)
+        self.connect_time = 0.0
+        self._content = content
+        self._prompt_tokens = prompt_tokens
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._chunk_delay = chunk_delay
+
+    @property
+    def text(self):
+        return json.dumps(self.json())
+
+    def json(self):
+        if self.status_code != 200:
+            return {"error": {"message": self._content}}
+        return {
+            "choices": [{"message": {"role": "assistant", "content": self._content}, "finish_reason": "stop"}],
+            "usage": self.usage(),
+        }
+
+    def usage(self):
+        return {"prompt_tokens": self._prompt_tokens, "completion_tokens": len(self._content) // 4}
+
+    def iter_lines(self, chunk_size=None):
+        for start in range(0, len(self._content), self._chunk_size):
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            delta = self._content[start:start + self._chunk_size]
+            event = {"choices": [{"delta": {"content": delta}}]}
+            yield b"data: " + json.dumps(event).encode("utf-8")
+        yield b"data: " + json.dumps({"choices": [], "usage": self.usage()}).encode("utf-8")
+        yield b"data: [DONE]"
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeProvider(Provider):
+    """Deterministic offline backend: the same prompt always gets the same quiz"""
+
+    name = "fake"
+    json_mode = True
+
+    _COUNT = re.compile(r"exactly (\d+)")
+    _WORD = re.compile(r"[A-Za-z][A-Za-z'-]{3,}")
+    _SENTENCE = re.compile(r"(?<=[.!?])\s+")
+    _ASKED = re.compile(r"^  - (.*)$", re.MULTILINE)  # Questions listed under "Do NOT repeat"
+
+    def __init__(self, client=None, model="fake-quiz", latency=0.0, chunk_delay=0.0, seed=0):
+        super().__init__(model)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.seed = seed
+
+    @property
+    def label(self):
+        return "Built-in offline generator"
+
+    def send(self, payload, stream=False):
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = payload["messages"][-1]["content"]
+        content = json.dumps({"quiz": self.make_questions(prompt)})
+        return FakeResponse(content, stream=stream, chunk_delay=self.chunk_delay, elapsed=self.latency,
+                            prompt_tokens=len(prompt) // 4)
+
+    def make_questions(self, prompt):
+        """Fill-in-the-blank questions on the prompt's text, skipping questions it lists as asked"""
+        match = self._COUNT.search(prompt)
+        count = int(match.group(1)) if match else 5
+        instructions, _, text = prompt.rpartition("Text to analyze:")
+        asked = set(self._ASKED.findall(instructions))
+        words = sorted(set(self._WORD.findall(text))) or ["topic", "subject", "idea", "concept"]
+
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        rng = random.Random(int(digest[:16], 16))
+        # Each answer term once (in a random sentence using it) before any term is reused
+        candidates = {}
+        for sentence in self._SENTENCE.split(text.strip()):
+            sentence_words = sentence.split()
+            for position, word in enumerate(sentence_words):
+                term = self._WORD.search(word)
+                if term:
+                    candidates.setdefault(term.group(0), []).append((sentence_words, position))
+        first, rest = [], []
+        for term, places in candidates.items():
+            rng.shuffle(places)
+            first.append((term, places[0]))
+            rest.extend((term, place) for place in places[1:])
+        rng.shuffle(first)
+        rng.shuffle(rest)
+
+        questions = []
+        for term, (sentence_words, position) in first + rest:
+            if len(questions) == count:
+                break
+            window = sentence_words[max(0, position - 6):position] + ["____"] + sentence_words[position + 1:position + 7]
+            question = f"Which term fills the blank in \"{' '.join(window)}\"?"
+            if question in asked:
+                continue
+            asked.add(question)
+            others = [word for word in words if word != term]
+            picks = rng.sample(others, 3) if len(others) >= 3 else [term + "*" * j for j in range(1, 4)]
+            picks.insert(rng.randrange(4), term)
+            options = [f"{letter}) {word}" for letter, word in zip("abcd", picks)]
+            questions.append({
+                "question": question,
+                "options": options,
+                "answer": options[picks.index(term)],
+                "explanation": f"The text uses \"{term}\" here.",
+            })
+        return questions
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "openai_compatible": OpenAICompatibleProvider,
+    "fake": FakeProvider,
+}
+
+
+def create_provider(backend, client=None, **options):
+    """Build the configured provider, e.g. create_provider("fake", latency=0.5)"""
+    try:
+        provider_cls = PROVIDERS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown model provider: {backend}")
+    return provider_cls(client, **options)
@@ -0,0 +1,108 @@
+"""Paraphrase-aware de-duplication of quiz questions.
+
+Exact-text checks miss reworded copies ("Which gas do plants release
+during photosynthesis?" vs "During photosynthesis, which gas is released
+by plants?"). Question texts are turned into TF-IDF weighted vectors of
+hashed character n-grams, which survive word order changes and
+inflections, and compared with a single matrix product against everything
+already asked for the paragraph.
+
+When both questions come with their correct answer, the answers decide
+close calls: "What does chlorophyll absorb?" and "What is absorbed by
+chlorophyll?" are a repeat if both answers are "Light energy", but not if
+the answers differ.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")
+_OPTION_LABEL = re.compile(r"^\s*[a-dA-D][).:]\s*")
+
+DIMENSIONS = 1 << 20   # Hash buckets for n-grams
+NGRAM_SIZES = (3, 4, 5)
+
+
+def _parts(question):
+    """(question text, answer text or "") of a question dict or plain question text"""
+    if isinstance(question, str):
+        return question, ""
+    return question["question"], _OPTION_LABEL.sub("", question.get("answer", ""))
+
+
+@lru_cache(maxsize=4096)
+def _buckets(text, dimensions):
+    """Hashed character n-grams of each word, as bucket numbers"""
+    hashes = []
+    for word in _NON_WORD.sub(" ", text.lower()).split():
+        word = f" {word} "
+        for n in NGRAM_SIZES:
+            hashes.extend(hash(word[i:i + n]) for i in range(len(word) - n + 1))
+    return np.array(hashes, dtype=np.int64) % dimensions
+
+
+def vectorize(texts, dimensions=DIMENSIONS):
+    """L2-normalized TF-IDF matrix (one row per text) of hashed character n-grams.
+
+    Columns are only the buckets that occur, so the matrix stays small
+    however large the hash space is.
+    """
+    rows = [_buckets(text, dimensions) for text in texts]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    columns, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+    row_ids = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+    width = len(columns)
+    counts = np.bincount(row_ids * width + inverse, minlength=len(rows) * width)
+    counts = counts.reshape(len(rows), width).astype(np.float32)
+    present = counts > 0
+    idf = np.log((1 + len(rows)) / (1 + present.sum(axis=0))) + 1
+    weights = np.where(present, 1 + np.log(np.maximum(counts, 1)), 0) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.maximum(norms, 1e-12)
+
+
+def duplicate_matrix(new, existing, threshold=0.7, answered_threshold=0.5, answer_threshold=0.8):
+    """Boolean matrix: new[i] repeats existing[j].
+
+    Without both answers, question similarity must reach threshold. With
+    both, answered_threshold is enough, but only if the answers match.
+    """
+    new_parts = [_parts(q) for q in new]
+    existing_parts = [_parts(q) for q in existing]
+    parts = new_parts + existing_parts
+    questions = vectorize([question for question, _ in parts])
+    answers = vectorize([answer for _, answer in parts])
+    count = len(new_parts)
+    question_similarity = questions[:count] @ questions[count:].T
+    answer_similarity = answers[:count] @ answers[count:].T
+    answered = np.array([bool(answer) for _, answer in parts])
+    both = answered[:count, None] & answered[None, count:]
+    return np.where(
+        both,
+        (question_similarity >= answered_threshold) & (answer_similarity >= answer_threshold),
+        question_similarity >= threshold,
+    )
+
+
+def unique_questions(questions, existing=(), threshold=0.7):
+    """questions without repeats of existing ones or of each other, in order.
+
+    questions and existing may be question dicts or plain question texts;
+    the first of two similar new questions is kept. threshold=0 turns the
+    check off.
+    """
+    questions = list(questions)
+    if not questions or threshold <= 0:
+        return questions
+    existing = list(existing)
+    repeats = duplicate_matrix(questions, existing + questions, threshold=threshold)
+    kept = []
+    compare = list(range(len(existing)))
+    for i, question in enumerate(questions):
+        if compare and repeats[i, compare].any():
+            continue
+        kept.append(question)
+        compare.append(len(existing) + i)
+    return kept
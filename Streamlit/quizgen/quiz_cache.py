@@ -0,0 +1,114 @@
+"""Persistent, content-addressed cache for generated quizzes.
+
+Entries live in a small SQLite file, so every Streamlit session and every
+server process on the machine shares the same cache. Keys are a hash of
+everything that influences the model output (normalized text, question
+count, model, temperature and prompt version).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+
+
+def normalize_text(text):
+    """Normalize text so trivial whitespace differences hit the same entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(text, num_questions, model, temperature, prompt_version):
+    """Build the content hash used as cache key"""
+    material = json.dumps(
+        [normalize_text(text), int(num_questions), model, float(temperature), prompt_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class QuizCache:
+    """On-disk quiz cache with TTL and size-based (LRU) eviction"""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_quiz_cache_last_access ON quiz_cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe to use from
+        # any thread; SQLite's own locking handles other processes.
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached quiz for key, or None if missing or expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM quiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+                return None
+
+            conn.execute(
+                "UPDATE quiz_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+
+        try:
+            return json.loads(payload)
+        except json.JSONDecodeError:
+            self.delete(key)
+            return None
+
+    def put(self, key, quiz):
+        """Store a quiz and evict expired / least recently used entries"""
+        now = time.time()
+        payload = json.dumps(quiz, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache (key, payload, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (key, payload, now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM quiz_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute("""
+            DELETE FROM quiz_cache WHERE key IN (
+                SELECT key FROM quiz_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
@@ -0,0 +1,137 @@
+"""Parsing and validation of model replies into quiz questions.
+
+The reply should be a {"quiz": [...]} object (the request asks for JSON
+mode), but models still wrap it in markdown fences, add a sentence in
+front or get cut off at max_tokens. extract_json() finds the first
+complete object in one pass, and every question is validated on its own
+so one bad question no longer throws away the rest of the quiz.
+"""
+import json
+import re
+
+from .streaming import QuizStreamParser
+
+OPTION_COUNT = 4
+
+_LETTER = re.compile(r"^\s*\(?([a-dA-D])[\).:]?\s*$")
+_OPTION_PREFIX = re.compile(r"^\s*\(?[a-dA-D][\).:]\s*")
+
+
+class QuizParseError(ValueError):
+    """Raised when no question at all could be read from a reply"""
+
+
+def extract_json(text):
+    """Return the first complete JSON object in text, or None"""
+    text = text.strip()
+    if text.startswith("{"):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = False
+        escape = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return json.loads(text[start:i + 1])
+                    except ValueError:
+                        break
+        else:
+            # Ran off the end: the reply was truncated
+            return None
+        start = text.find("{", start + 1)
+    return None
+
+
+def _strip_option_prefix(option):
+    return _OPTION_PREFIX.sub("", option).strip().lower()
+
+
+def _match_answer(answer, options):
+    """Find the option the answer refers to (exact, by letter or by text)"""
+    if answer in options:
+        return answer
+    letter = _LETTER.match(answer)
+    if letter:
+        index = "abcd".index(letter.group(1).lower())
+        return options[index] if index < len(options) else None
+    wanted = _strip_option_prefix(answer)
+    for option in options:
+        if _strip_option_prefix(option) == wanted:
+            return option
+    return None
+
+
+def validate_question(data):
+    """Return a clean question dict, or None if it can't be used"""
+    if not isinstance(data, dict):
+        return None
+    question = data.get("question")
+    options = data.get("options")
+    answer = data.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != OPTION_COUNT:
+        return None
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        return None
+    if len(set(options)) != len(options) or not isinstance(answer, str):
+        return None
+
+    answer = _match_answer(answer, options)
+    if answer is None:
+        return None
+
+    explanation = data.get("explanation")
+    return {
+        "question": question.strip(),
+        "options": list(options),
+        "answer": answer,
+        "explanation": explanation.strip() if isinstance(explanation, str) else "",
+    }
+
+
+def parse_quiz_response(text):
+    """Parse a reply into (valid_questions, rejected_count).
+
+    Falls back to reading the complete question objects out of a
+    truncated reply. Raises QuizParseError when nothing usable is found.
+    """
+    data = extract_json(text)
+    if isinstance(data, dict):
+        items = data.get("quiz", data.get("questions"))
+    elif isinstance(data, list):
+        items = data
+    else:
+        items = None
+
+    if not isinstance(items, list):
+        items = QuizStreamParser().feed(text)
+    if not items:
+        raise QuizParseError("No questions found in the reply")
+
+    questions = []
+    for item in items:
+        question = validate_question(item)
+        if question is not None:
+            questions.append(question)
+    return questions, len(items) - len(questions)
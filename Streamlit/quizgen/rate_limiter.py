@@ -0,0 +1,214 @@
+"""Client-side token-bucket rate limiter for model API requests.
+
+One limiter is shared by every session in the server process. Waiting
+callers are admitted strictly in arrival order. When a state path is given,
+the bucket itself lives in a small SQLite file, so several server processes
+on the same machine share one budget.
+"""
+import collections
+import os
+import sqlite3
+import threading
+import time
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited longer than its timeout for a slot"""
+
+
+class _Waiter:
+    __slots__ = ("enqueued_at",)
+
+    def __init__(self):
+        self.enqueued_at = time.monotonic()
+
+
+class _LocalBucket:
+    """Bucket state kept in this process"""
+
+    def __init__(self, rate, capacity, min_interval):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.last_admit = None
+        self.blocked_until = 0.0
+
+    def try_reserve(self):
+        """Take a token if allowed now; otherwise return seconds to wait"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        delay = max(0.0, self.blocked_until - now)
+        if self.last_admit is not None:
+            delay = max(delay, self.last_admit + self.min_interval - now)
+        if self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        if delay > 0:
+            return delay
+
+        self.tokens -= 1
+        self.last_admit = now
+        return 0.0
+
+    def defer(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _SharedBucket:
+    """Bucket state kept in SQLite so several processes share one budget"""
+
+    def __init__(self, path, rate, capacity, min_interval):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.min_interval = min_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    last_admit REAL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO rate_limit (id, tokens, updated) VALUES (1, ?, ?)",
+                (capacity, time.time()),
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def try_reserve(self):
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so read-modify-write is atomic
+            conn.execute("BEGIN IMMEDIATE")
+            tokens, updated, last_admit, blocked_until = conn.execute(
+                "SELECT tokens, updated, last_admit, blocked_until FROM rate_limit WHERE id = 1"
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+            delay = max(0.0, blocked_until - now)
+            if last_admit is not None:
+                delay = max(delay, last_admit + self.min_interval - now)
+            if tokens < 1:
+                delay = max(delay, (1 - tokens) / self.rate)
+
+            if delay > 0:
+                conn.execute("UPDATE rate_limit SET tokens = ?, updated = ? WHERE id = 1", (tokens, now))
+            else:
+                conn.execute(
+                    "UPDATE rate_limit SET tokens = ?, updated = ?, last_admit = ? WHERE id = 1",
+                    (tokens - 1, now, now),
+                )
+            conn.execute("COMMIT")
+            return delay
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def defer(self, seconds):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE rate_limit SET blocked_until = MAX(blocked_until, ?) WHERE id = 1",
+                (time.time() + seconds,),
+            )
+        finally:
+            conn.close()
+
+
+class RateLimiter:
+    """Admit requests at a fixed rate and queue the rest in FIFO order"""
+
+    def __init__(self, requests_per_minute, min_delay_seconds=0, burst=1, state_path=None):
+        rate = requests_per_minute / 60.0
+        capacity = max(1, burst)
+        self.interval = max(1 / rate, min_delay_seconds)  # Seconds between admissions once the burst is used
+        if state_path:
+            self._bucket = _SharedBucket(state_path, rate, capacity, min_delay_seconds)
+        else:
+            self._bucket = _LocalBucket(rate, capacity, min_delay_seconds)
+
+        self._cond = threading.Condition()
+        self._queue = collections.deque()
+        self.admitted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def acquire(self, timeout=None):
+        """Block until this caller may send a request.
+
+        Returns the seconds spent waiting; raises RateLimitTimeout if no
+        slot was granted within timeout seconds.
+        """
+        waiter = _Waiter()
+        deadline = None if timeout is None else waiter.enqueued_at + timeout
+
+        with self._cond:
+            self._queue.append(waiter)
+            try:
+                while True:
+                    if self._queue[0] is waiter:
+                        delay = self._bucket.try_reserve()
+                        if delay <= 0:
+                            break
+                    else:
+                        # Not our turn yet; the head wakes us when it leaves
+                        delay = None
+
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitTimeout(f"No request slot within {timeout:g}s")
+                        delay = remaining if delay is None else min(delay, remaining)
+                    self._cond.wait(delay)
+            finally:
+                self._queue.remove(waiter)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - waiter.enqueued_at
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.last_wait = waited
+            return waited
+
+    def queue_time(self):
+        """Seconds the callers queued right now take to get through at the steady rate"""
+        with self._cond:
+            return len(self._queue) * self.interval
+
+    def defer(self, seconds):
+        """Hold back every caller for `seconds` (e.g. after a 429 Retry-After)"""
+        with self._cond:
+            self._bucket.defer(seconds)
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Queue depth and wait-time numbers for display"""
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "admitted": self.admitted,
+                "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+                "max_wait": self.max_wait,
+                "last_wait": self.last_wait,
+            }
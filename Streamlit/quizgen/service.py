@@ -0,0 +1,250 @@
+"""HTTP API around QuizEngine.
+
+Runs quiz generation as its own process so it can be scaled, restarted
+and monitored apart from the Streamlit app. Generation is asynchronous:
+a job is created, polled until it finishes and then deleted.
+
+    POST   /v1/jobs        {"kind": "quiz"|"top_up", "text": ..., "num_questions": 10,
+                            "use_cache": true, "avoid": [...]}     -> 202 {"id": ...}
+    GET    /v1/jobs/<id>   -> {"status", "message", "partial", "result", "error"}
+    DELETE /v1/jobs/<id>   cancels the job if it is still running and forgets it
+    GET    /healthz        -> {"ok", "provider", "ready", "active_jobs"}
+    GET    /metrics        Prometheus text
+
+avoid lists questions already asked, as texts or {"question", "answer"}
+objects (answers help tell reworded repeats from new questions).
+
+Start it from the Streamlit directory:
+
+    QUIZ_PROVIDER=fake python -m quizgen.service --port 8600
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .engine import QuizEngine, settings_from_env
+from .http_client import PooledClient
+from .jobs import JobManager
+from .metrics import RequestMetrics
+from .providers import create_provider
+from .quiz_cache import QuizCache
+from .rate_limiter import RateLimiter
+
+JOB_KINDS = ("quiz", "top_up")
+
+MAX_BODY_BYTES = 2 * 1024 * 1024
+
+
+class BadRequest(ValueError):
+    """Invalid job request; reported to the client as HTTP 400"""
+
+
+class QuizService:
+    """Runs engine calls as background jobs addressed by id"""
+
+    def __init__(self, engine, jobs=None, max_document_chars=100000, max_questions=50):
+        self.engine = engine
+        self.jobs = jobs if jobs is not None else JobManager()
+        self.max_document_chars = max_document_chars
+        self.max_questions = max_questions
+
+    def submit(self, request):
+        """Validate a job request and start it; returns the job id"""
+        if not isinstance(request, dict):
+            raise BadRequest("Request body must be a JSON object.")
+        kind = request.get("kind", "quiz")
+        if kind not in JOB_KINDS:
+            raise BadRequest(f"kind must be one of: {', '.join(JOB_KINDS)}")
+        text = request.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise BadRequest("text is required.")
+        if len(text) > self.max_document_chars:
+            raise BadRequest(f"text is longer than {self.max_document_chars} characters.")
+        num_questions = request.get("num_questions", 5)
+        if not isinstance(num_questions, int) or not 1 <= num_questions <= self.max_questions:
+            raise BadRequest(f"num_questions must be an integer from 1 to {self.max_questions}.")
+        avoid = request.get("avoid", [])
+        if not isinstance(avoid, list) or not all(
+                isinstance(q, str) or isinstance(q, dict) and isinstance(q.get("question"), str) for q in avoid):
+            raise BadRequest("avoid must be a list of question texts or question objects.")
+
+        if kind == "top_up":
+            return self.jobs.submit(self.engine.top_up, text, num_questions, avoid, label=kind)
+        return self.jobs.submit(self.engine.generate_cached, text, num_questions,
+                                use_cache=bool(request.get("use_cache", True)), label=kind)
+
+    def status(self, job_id):
+        """JSON-ready view of a job, or None if it is unknown"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        result = None
+        if job.result is not None:
+            questions, error, source = job.result
+            result = {"questions": questions, "error": error, "source": source}
+        return {
+            "id": job.id,
+            "kind": job.label,
+            "status": job.status,
+            "message": job.message,
+            "attempts": job.attempts,
+            "partial": list(job.partial),
+            "result": result,
+            "error": job.error,
+        }
+
+    def delete(self, job_id):
+        """Cancel a job if it is still running and drop it; False if unknown"""
+        if self.jobs.get(job_id) is None:
+            return False
+        self.jobs.cancel(job_id)
+        self.jobs.forget(job_id)
+        return True
+
+    def health(self):
+        return {
+            "ok": True,
+            "provider": self.engine.label,
+            "ready": self.engine.ready,
+            "active_jobs": self.jobs.active_count(),
+        }
+
+
+def make_handler(service):
+    """Request handler class bound to service"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive for the polling client
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def job_id(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            if len(parts) == 3 and parts[:2] == ["v1", "jobs"]:
+                return parts[2]
+            return None
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/healthz":
+                self.send_json(200, service.health())
+                return
+            if path == "/metrics":
+                body = service.engine.metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            job_id = self.job_id()
+            status = service.status(job_id) if job_id else None
+            if status is None:
+                self.send_json(404, {"error": "Unknown job."})
+                return
+            self.send_json(200, status)
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/jobs":
+                self.send_json(404, {"error": "Not found."})
+                return
+            try:
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    raise BadRequest("Content-Length must be an integer.")
+                if length < 0:
+                    # rfile.read(-1) would wait for the client to close the connection
+                    raise BadRequest("Content-Length must not be negative.")
+                if length > MAX_BODY_BYTES:
+                    raise BadRequest("Request body is too large.")
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    raise BadRequest("Request body is not valid JSON.")
+                job_id = service.submit(request)
+            except BadRequest as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            self.send_json(202, {"id": job_id})
+
+        def do_DELETE(self):
+            job_id = self.job_id()
+            if not job_id or not service.delete(job_id):
+                self.send_json(404, {"error": "Unknown job."})
+                return
+            self.send_json(200, {"id": job_id, "deleted": True})
+
+    return Handler
+
+
+def serve(service, port=8600, host="127.0.0.1", background=False):
+    """Serve the API; with background=True in a daemon thread, returning the server"""
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+    if background:
+        threading.Thread(target=httpd.serve_forever, name="quiz-service", daemon=True).start()
+        return httpd
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return httpd
+
+
+def build_engine(args):
+    """Engine configured from command-line arguments and the same environment variables as the app"""
+    backend = args.provider
+    options = {
+        "openai": {"api_key": os.environ.get("OPENAI_API_KEY")},
+        "openai_compatible": {
+            "base_url": os.environ.get("QUIZ_PROVIDER_URL", "http://localhost:8000/v1"),
+            "model": os.environ.get("QUIZ_PROVIDER_MODEL", "llama3.1:8b"),
+            "api_key": os.environ.get("QUIZ_PROVIDER_KEY"),
+        },
+        "fake": {},
+    }.get(backend, {})
+    provider = create_provider(backend, PooledClient(), **options)
+    limiter = RateLimiter(args.rpm, min_delay_seconds=args.min_delay, state_path=args.rate_limit_state)
+    cache = QuizCache(args.cache) if args.cache else None
+    return QuizEngine(provider, limiter, cache=cache, metrics=RequestMetrics(jsonl_path=args.metrics_log),
+                      **settings_from_env())
+
+
+def main(argv=None):
+    data_dir = os.environ.get("STUDY_DATA_DIR",
+                              os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".data"))
+    parser = argparse.ArgumentParser(description="Quiz generation HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--provider", default=os.environ.get("QUIZ_PROVIDER", "openai"),
+                        help="openai, openai_compatible or fake")
+    parser.add_argument("--rpm", type=float, default=float(os.environ.get("QUIZ_RPM", 3)))
+    parser.add_argument("--min-delay", type=float, default=float(os.environ.get("QUIZ_MIN_DELAY", 20)))
+    parser.add_argument("--workers", type=int, default=4, help="quizzes generated at the same time")
+    parser.add_argument("--cache", default=os.path.join(data_dir, "quiz_cache.sqlite3"),
+                        help="quiz cache file ('' to disable)")
+    parser.add_argument("--rate-limit-state", default=None, help="SQLite file to share the rate limit")
+    parser.add_argument("--metrics-log", default=None, help="append every API request to this JSONL file")
+    args = parser.parse_args(argv)
+
+    service = QuizService(build_engine(args), JobManager(max_workers=args.workers))
+    print(f"Quiz service on http://{args.host}:{args.port} ({service.engine.label})")
+    serve(service, args.port, args.host)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Coalescing of identical in-flight calls (single-flight).
+
+When many sessions ask for the same thing at the same moment (a class
+pasting the same handout), only the first caller for a key runs the work;
+everyone else arriving while it runs waits and receives the same result.
+Once the call finishes the key is released, so later callers go through
+the normal path again (usually a cache hit by then).
+"""
+import threading
+
+
+class FlightCancelled(Exception):
+    """A waiting caller gave up because its own cancel event was set"""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run fn once per key at a time and share its result with concurrent callers"""
+
+    def __init__(self, poll_interval=0.1):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, cancel_event=None):
+        """Return (result, shared); shared is True when another caller did the work.
+
+        Exceptions raised by fn reach every caller of that flight. A waiting
+        caller whose cancel_event gets set raises FlightCancelled; the
+        flight itself keeps running for the others.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result, False
+
+        while not call.done.wait(self.poll_interval):
+            if cancel_event is not None and cancel_event.is_set():
+                with self._lock:
+                    call.waiters -= 1
+                raise FlightCancelled(key)
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiting": sum(call.waiters for call in self._calls.values()),
+                "leaders": self.leaders,
+                "shared": self.shared,
+            }
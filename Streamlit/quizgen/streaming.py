@@ -0,0 +1,100 @@
+"""Helpers for streamed chat completions.
+
+iter_stream_content() turns a server-sent-events response into content
+deltas. QuizStreamParser pulls each finished question object out of the
+partially received {"quiz": [...]} reply, so questions can be shown before
+the whole completion has arrived.
+"""
+import json
+import re
+
+_QUIZ_ARRAY = re.compile(r'"quiz"\s*:\s*\[')
+
+
+def iter_stream_content(response, usage=None):
+    """Yield content deltas from a streamed chat-completions response.
+
+    If a usage dict is passed, it is filled from the final usage event
+    (sent when the request had stream_options.include_usage).
+    """
+    for line in response.iter_lines(chunk_size=None):
+        if not line or not line.startswith(b"data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == b"[DONE]":
+            break
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            continue
+        if usage is not None and event.get("usage"):
+            usage.update(event["usage"])
+        for choice in event.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class QuizStreamParser:
+    """Incrementally extract complete question objects from streamed JSON"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.questions = []
+        self.done = False
+        self._in_array = False
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Add more text; returns the question objects completed by it"""
+        self.buffer += text
+        completed = []
+        if self.done:
+            return completed
+
+        if not self._in_array:
+            match = _QUIZ_ARRAY.search(self.buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        buffer = self.buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        question = json.loads(buffer[self._start:i + 1])
+                    except ValueError:
+                        question = None
+                    if isinstance(question, dict):
+                        self.questions.append(question)
+                        completed.append(question)
+                    self._start = None
+            elif ch == "]" and self._depth == 0:
+                self.done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return completed
@@ -0,0 +1,91 @@
+"""Token counting and request sizing.
+
+Tokens are counted with tiktoken when it is installed (and its encoding
+files are available); otherwise a calibrated estimator is used. It
+tends to count a little high on prose and JSON, so budgets built on it
+stay on the safe side.
+
+The completion budget (max_tokens) grows with the number of questions
+asked for, so small quizzes don't reserve room they never use and large
+ones are not cut off mid-JSON.
+"""
+import math
+import re
+from functools import lru_cache
+
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\W\d_]+|[^\w\s]|_")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Not installed, or the encoding can't be downloaded: estimate instead
+        return None
+
+
+def estimate_tokens(text):
+    """Tokenizer-free estimate: short words are one token, long words split
+    every ~6 letters, digits go in groups of 3, punctuation is one each and
+    non-Latin scripts count about one token per character"""
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        if piece.isascii() and piece.isalpha():
+            tokens += math.ceil(len(piece) / 6)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece.isascii():
+            tokens += 1
+        else:
+            tokens += len(piece)
+    return tokens
+
+
+def count_tokens(text):
+    """Token count of text, exact when tiktoken is available"""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def completion_budget(num_questions, tokens_per_question=120, overhead=20, margin=1.25,
+                      minimum=256, maximum=4096):
+    """max_tokens for a reply holding num_questions questions, with a safety margin"""
+    needed = (num_questions * tokens_per_question + overhead) * margin
+    return int(min(maximum, max(minimum, math.ceil(needed))))
+
+
+def trim_to_tokens(text, max_tokens):
+    """Cut text to at most max_tokens, at a sentence boundary where possible"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    used = 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence) + 1  # The joining space
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if kept:
+        return " ".join(kept)
+
+    # A single sentence is already too long: keep whole words that fit
+    words = []
+    used = 0
+    for word in text.split():
+        tokens = count_tokens(word) + 1
+        if used + tokens > max_tokens:
+            break
+        words.append(word)
+        used += tokens
+    return " ".join(words)
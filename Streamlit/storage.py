@@ -0,0 +1,499 @@
+"""Persistence for paragraphs, quizzes, question pools, quiz history, stats and counters.
+
+Storage is the interface the app talks to. SQLiteStorage is the default
+backend (WAL mode, everything indexed by user), and MemoryStorage keeps
+data for the life of the process only. Every change is written as it
+happens instead of snapshotting the whole session.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from models import Attempt, Paragraph, Question, QuestionPool, Quiz
+from study_stats import StudyStats
+
+
+SCHEMA_VERSION = 1
+
+
+class Storage:
+    """Interface for storage backends; all methods are scoped to one user"""
+
+    def load_paragraphs(self, user_id):
+        """Return the user's Paragraphs, oldest first"""
+        raise NotImplementedError
+
+    def add_paragraph(self, user_id, paragraph):
+        raise NotImplementedError
+
+    def add_paragraphs(self, user_id, paragraphs):
+        """Store many paragraphs at once (all or none)"""
+        raise NotImplementedError
+
+    def delete_paragraph(self, user_id, paragraph_id):
+        """Delete a paragraph together with its quiz and question pool"""
+        raise NotImplementedError
+
+    def clear_paragraphs(self, user_id):
+        """Delete all paragraphs, quizzes and question pools"""
+        raise NotImplementedError
+
+    def load_quizzes(self, user_id):
+        """Return {paragraph_id: Quiz}"""
+        raise NotImplementedError
+
+    def save_quiz(self, user_id, quiz):
+        """Store a quiz, replacing any previous quiz for the same paragraph"""
+        raise NotImplementedError
+
+    def delete_quiz(self, user_id, paragraph_id):
+        raise NotImplementedError
+
+    def load_pools(self, user_id):
+        """Return {paragraph_id: QuestionPool}"""
+        raise NotImplementedError
+
+    def load_pool(self, user_id, paragraph_id):
+        """Return one QuestionPool, or None"""
+        raise NotImplementedError
+
+    def save_pool(self, user_id, pool):
+        """Store a question pool (questions and answer stats), replacing the previous one"""
+        raise NotImplementedError
+
+    def load_pooled_paragraphs(self):
+        """Return (user_id, paragraph_id, text) of every paragraph with an API-generated
+        question pool, across all users; used to index material for reuse"""
+        raise NotImplementedError
+
+    def load_history(self, user_id):
+        """Return the user's Attempts, oldest first"""
+        raise NotImplementedError
+
+    def add_attempt(self, user_id, attempt):
+        """Store an attempt and apply it to the stored StudyStats in the same transaction.
+
+        Idempotent: an attempt id that is already stored changes nothing.
+        Returns the updated StudyStats, or None if the attempt was not new.
+        """
+        raise NotImplementedError
+
+    def clear_history(self, user_id):
+        """Delete all attempts and the stats built from them"""
+        raise NotImplementedError
+
+    def load_stats(self, user_id):
+        """Return the user's StudyStats, or None if none were stored yet"""
+        raise NotImplementedError
+
+    def load_counters(self, user_id):
+        """Return {name: value}"""
+        raise NotImplementedError
+
+    def add_counter(self, user_id, name, amount=1):
+        """Increment a counter atomically; returns its new value"""
+        raise NotImplementedError
+
+    def set_counter(self, user_id, name, value):
+        """Overwrite a counter, e.g. to reset it"""
+        raise NotImplementedError
+
+
+class MemoryStorage(Storage):
+    """Process-local backend, mainly for tests and throwaway deployments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paragraphs = {}
+        self._quizzes = {}
+        self._pools = {}
+        self._history = {}
+        self._stats = {}
+        self._counters = {}
+
+    def load_paragraphs(self, user_id):
+        with self._lock:
+            return list(self._paragraphs.get(user_id, {}).values())
+
+    def add_paragraph(self, user_id, paragraph):
+        with self._lock:
+            self._paragraphs.setdefault(user_id, {})[paragraph.id] = paragraph
+
+    def add_paragraphs(self, user_id, paragraphs):
+        with self._lock:
+            stored = self._paragraphs.setdefault(user_id, {})
+            for paragraph in paragraphs:
+                stored[paragraph.id] = paragraph
+
+    def delete_paragraph(self, user_id, paragraph_id):
+        with self._lock:
+            self._paragraphs.get(user_id, {}).pop(paragraph_id, None)
+            self._quizzes.get(user_id, {}).pop(paragraph_id, None)
+            self._pools.get(user_id, {}).pop(paragraph_id, None)
+
+    def clear_paragraphs(self, user_id):
+        with self._lock:
+            self._paragraphs.pop(user_id, None)
+            self._quizzes.pop(user_id, None)
+            self._pools.pop(user_id, None)
+
+    def load_quizzes(self, user_id):
+        with self._lock:
+            return dict(self._quizzes.get(user_id, {}))
+
+    def save_quiz(self, user_id, quiz):
+        with self._lock:
+            self._quizzes.setdefault(user_id, {})[quiz.paragraph_id] = quiz
+
+    def delete_quiz(self, user_id, paragraph_id):
+        with self._lock:
+            self._quizzes.get(user_id, {}).pop(paragraph_id, None)
+
+    def load_pools(self, user_id):
+        with self._lock:
+            return dict(self._pools.get(user_id, {}))
+
+    def load_pool(self, user_id, paragraph_id):
+        with self._lock:
+            return self._pools.get(user_id, {}).get(paragraph_id)
+
+    def save_pool(self, user_id, pool):
+        with self._lock:
+            self._pools.setdefault(user_id, {})[pool.paragraph_id] = pool
+
+    def load_pooled_paragraphs(self):
+        with self._lock:
+            return [
+                (user_id, paragraph_id, self._paragraphs[user_id][paragraph_id].text)
+                for user_id, pools in self._pools.items()
+                for paragraph_id, pool in pools.items()
+                if pool.source != "local" and paragraph_id in self._paragraphs.get(user_id, {})
+            ]
+
+    def load_history(self, user_id):
+        with self._lock:
+            return list(self._history.get(user_id, []))
+
+    def add_attempt(self, user_id, attempt):
+        with self._lock:
+            history = self._history.setdefault(user_id, [])
+            if any(stored.id == attempt.id for stored in history):
+                return None
+            data = self._stats.get(user_id)
+            stats = StudyStats.from_dict(data) if data is not None else StudyStats.from_attempts(history)
+            history.append(attempt)
+            stats.record(attempt)
+            self._stats[user_id] = stats.to_dict()
+            return stats
+
+    def clear_history(self, user_id):
+        with self._lock:
+            self._history.pop(user_id, None)
+            self._stats.pop(user_id, None)
+
+    def load_stats(self, user_id):
+        with self._lock:
+            data = self._stats.get(user_id)
+        return StudyStats.from_dict(data) if data is not None else None
+
+    def load_counters(self, user_id):
+        with self._lock:
+            return dict(self._counters.get(user_id, {}))
+
+    def add_counter(self, user_id, name, amount=1):
+        with self._lock:
+            counters = self._counters.setdefault(user_id, {})
+            counters[name] = counters.get(name, 0) + amount
+            return counters[name]
+
+    def set_counter(self, user_id, name, value):
+        with self._lock:
+            self._counters.setdefault(user_id, {})[name] = value
+
+
+class SQLiteStorage(Storage):
+    """SQLite backend in WAL mode so several server workers can share it"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._create_tables(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _create_tables(self, conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS paragraphs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_paragraphs_user ON paragraphs (user_id, created_at);
+
+            CREATE TABLE IF NOT EXISTS quizzes (
+                id TEXT PRIMARY KEY,
+                paragraph_id TEXT NOT NULL UNIQUE,
+                user_id TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                source TEXT NOT NULL DEFAULT 'api'
+            );
+            CREATE INDEX IF NOT EXISTS idx_quizzes_user ON quizzes (user_id);
+
+            CREATE TABLE IF NOT EXISTS question_pools (
+                paragraph_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                stats TEXT NOT NULL DEFAULT '{}',
+                source TEXT NOT NULL DEFAULT 'api',
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_question_pools_user ON question_pools (user_id);
+
+            CREATE TABLE IF NOT EXISTS attempts (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                quiz_id TEXT NOT NULL,
+                paragraph_id TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                percentage REAL NOT NULL,
+                date TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts (user_id, created_at);
+
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS counters (
+                user_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (user_id, name)
+            );
+        """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load_paragraphs(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, text, created_at FROM paragraphs WHERE user_id = ? ORDER BY created_at", (user_id,)
+            ).fetchall()
+        return [Paragraph(id=id_, text=text, created_at=created_at) for id_, text, created_at in rows]
+
+    def add_paragraph(self, user_id, paragraph):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO paragraphs (id, user_id, text, created_at) VALUES (?, ?, ?, ?)",
+                (paragraph.id, user_id, paragraph.text, paragraph.created_at),
+            )
+
+    def add_paragraphs(self, user_id, paragraphs):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO paragraphs (id, user_id, text, created_at) VALUES (?, ?, ?, ?)",
+                [(p.id, user_id, p.text, p.created_at) for p in paragraphs],
+            )
+
+    def delete_paragraph(self, user_id, paragraph_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM quizzes WHERE user_id = ? AND paragraph_id = ?", (user_id, paragraph_id))
+            conn.execute("DELETE FROM question_pools WHERE user_id = ? AND paragraph_id = ?", (user_id, paragraph_id))
+            conn.execute("DELETE FROM paragraphs WHERE user_id = ? AND id = ?", (user_id, paragraph_id))
+
+    def clear_paragraphs(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM quizzes WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM question_pools WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM paragraphs WHERE user_id = ?", (user_id,))
+
+    def load_quizzes(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, paragraph_id, questions, created_at, source FROM quizzes WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return {
+            paragraph_id: Quiz(
+                id=id_,
+                paragraph_id=paragraph_id,
+                questions=[Question.from_dict(q) for q in json.loads(questions)],
+                created_at=created_at,
+                source=source,
+            )
+            for id_, paragraph_id, questions, created_at, source in rows
+        }
+
+    def save_quiz(self, user_id, quiz):
+        questions = json.dumps([q.to_dict() for q in quiz.questions], ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quizzes (id, paragraph_id, user_id, questions, created_at, source) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (quiz.id, quiz.paragraph_id, user_id, questions, quiz.created_at, quiz.source),
+            )
+
+    def delete_quiz(self, user_id, paragraph_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM quizzes WHERE user_id = ? AND paragraph_id = ?", (user_id, paragraph_id))
+
+    def load_pools(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT paragraph_id, questions, stats, source, created_at FROM question_pools WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        return {
+            paragraph_id: QuestionPool(
+                paragraph_id=paragraph_id,
+                questions=[Question.from_dict(q) for q in json.loads(questions)],
+                stats=json.loads(stats),
+                source=source,
+                created_at=created_at,
+            )
+            for paragraph_id, questions, stats, source, created_at in rows
+        }
+
+    def load_pool(self, user_id, paragraph_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT questions, stats, source, created_at FROM question_pools WHERE user_id = ? AND paragraph_id = ?",
+                (user_id, paragraph_id),
+            ).fetchone()
+        if row is None:
+            return None
+        questions, stats, source, created_at = row
+        return QuestionPool(
+            paragraph_id=paragraph_id,
+            questions=[Question.from_dict(q) for q in json.loads(questions)],
+            stats=json.loads(stats),
+            source=source,
+            created_at=created_at,
+        )
+
+    def save_pool(self, user_id, pool):
+        questions = json.dumps([q.to_dict() for q in pool.questions], ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO question_pools (paragraph_id, user_id, questions, stats, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pool.paragraph_id, user_id, questions, json.dumps(pool.stats, ensure_ascii=False),
+                 pool.source, pool.created_at),
+            )
+
+    def load_pooled_paragraphs(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT p.user_id, p.id, p.text FROM paragraphs p "
+                "JOIN question_pools q ON q.paragraph_id = p.id AND q.user_id = p.user_id "
+                "WHERE q.source != 'local'"
+            ).fetchall()
+
+    def load_history(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, quiz_id, paragraph_id, score, total, percentage, date, created_at "
+                "FROM attempts WHERE user_id = ? ORDER BY created_at",
+                (user_id,),
+            ).fetchall()
+        return [Attempt(*row) for row in rows]
+
+    def add_attempt(self, user_id, attempt):
+        # One write transaction, so the stats never disagree with the attempts: the
+        # stored stats are read, updated and written back with no other writer in between
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO attempts "
+                "(id, user_id, quiz_id, paragraph_id, score, total, percentage, date, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (attempt.id, user_id, attempt.quiz_id, attempt.paragraph_id, attempt.score,
+                 attempt.total, attempt.percentage, attempt.date, attempt.created_at),
+            ).rowcount
+            if not inserted:
+                return None
+            row = conn.execute("SELECT data FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+            if row is not None:
+                stats = StudyStats.from_dict(json.loads(row[0]))
+                stats.record(attempt)
+            else:
+                # No stats stored yet: build them from every attempt, this one included
+                rows = conn.execute(
+                    "SELECT id, quiz_id, paragraph_id, score, total, percentage, date, created_at "
+                    "FROM attempts WHERE user_id = ? ORDER BY created_at",
+                    (user_id,),
+                ).fetchall()
+                stats = StudyStats.from_attempts(Attempt(*r) for r in rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO user_stats (user_id, data) VALUES (?, ?)",
+                (user_id, json.dumps(stats.to_dict())),
+            )
+        return stats
+
+    def clear_history(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM attempts WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+
+    def load_stats(self, user_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        return StudyStats.from_dict(json.loads(row[0])) if row else None
+
+    def load_counters(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, value FROM counters WHERE user_id = ?", (user_id,)).fetchall()
+        return {name: int(value) if float(value).is_integer() else value for name, value in rows}
+
+    def add_counter(self, user_id, name, amount=1):
+        # Increment in SQL so concurrent sessions of the same user all count
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (user_id, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, name) DO UPDATE SET value = value + excluded.value",
+                (user_id, name, amount),
+            )
+            value = conn.execute(
+                "SELECT value FROM counters WHERE user_id = ? AND name = ?", (user_id, name)
+            ).fetchone()[0]
+        return int(value) if float(value).is_integer() else value
+
+    def set_counter(self, user_id, name, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO counters (user_id, name, value) VALUES (?, ?, ?)",
+                (user_id, name, value),
+            )
+
+
+BACKENDS = {
+    "sqlite": SQLiteStorage,
+    "memory": MemoryStorage,
+}
+
+
+def create_storage(backend="sqlite", **options):
+    """Build the configured backend, e.g. create_storage("sqlite", path=...)"""
+    try:
+        backend_cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return backend_cls(**options)
@@ -0,0 +1,95 @@
+"""Running aggregates over a user's quiz attempts.
+
+StudyStats is updated in O(1) per recorded attempt and stored next to the
+attempts, so the statistics pages never rescan the full history. It keeps
+overall totals, per-paragraph and per-day rollups and day streaks.
+"""
+from datetime import date, timedelta
+
+
+def _day(attempt):
+    # Attempt.date is "YYYY-MM-DD HH:MM"
+    return attempt.date[:10]
+
+
+class StudyStats:
+    """Counts, sums, min/max and streaks over every recorded attempt"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.questions = 0
+        self.correct = 0
+        self.percentage_sum = 0.0
+        self.best = None
+        self.worst = None
+        self.latest = None
+        self.per_quiz = {}   # paragraph id -> {"attempts", "best", "latest", "percentage_sum"}
+        self.per_day = {}    # "YYYY-MM-DD" -> {"attempts", "questions", "correct"}
+        self.last_day = None
+        self.streak = 0
+        self.longest_streak = 0
+
+    @classmethod
+    def from_attempts(cls, attempts):
+        """Build from scratch, e.g. for history recorded before stats were kept"""
+        stats = cls()
+        for attempt in attempts:
+            stats.record(attempt)
+        return stats
+
+    def record(self, attempt):
+        self.attempts += 1
+        self.questions += attempt.total
+        self.correct += attempt.score
+        self.percentage_sum += attempt.percentage
+        self.best = attempt.percentage if self.best is None else max(self.best, attempt.percentage)
+        self.worst = attempt.percentage if self.worst is None else min(self.worst, attempt.percentage)
+        self.latest = attempt.percentage
+
+        quiz = self.per_quiz.setdefault(
+            attempt.paragraph_id, {"attempts": 0, "best": 0.0, "latest": 0.0, "percentage_sum": 0.0}
+        )
+        quiz["attempts"] += 1
+        quiz["best"] = max(quiz["best"], attempt.percentage)
+        quiz["latest"] = attempt.percentage
+        quiz["percentage_sum"] += attempt.percentage
+
+        day = _day(attempt)
+        totals = self.per_day.setdefault(day, {"attempts": 0, "questions": 0, "correct": 0})
+        totals["attempts"] += 1
+        totals["questions"] += attempt.total
+        totals["correct"] += attempt.score
+
+        if self.last_day is None or day > self.last_day:
+            previous = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+            self.streak = self.streak + 1 if self.last_day == previous else 1
+            self.last_day = day
+            self.longest_streak = max(self.longest_streak, self.streak)
+
+    @property
+    def average(self):
+        return self.percentage_sum / self.attempts if self.attempts else 0.0
+
+    @property
+    def accuracy(self):
+        return self.correct / self.questions * 100 if self.questions else 0.0
+
+    def current_streak(self, today=None):
+        """Days in a row with at least one quiz, if the run reaches today or yesterday"""
+        if self.last_day is None:
+            return 0
+        today = today or date.today()
+        if self.last_day in (today.isoformat(), (today - timedelta(days=1)).isoformat()):
+            return self.streak
+        return 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in vars(self)}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name, value in data.items():
+            if hasattr(stats, name):
+                setattr(stats, name, value)
+        return stats